@@ -0,0 +1,389 @@
+import sys
+
+from logic import *
+
+# Terminal nodes
+FALSE = 0
+TRUE = 1
+
+
+class BDD():
+    """
+    Manager for reduced ordered binary decision diagrams.
+
+    Nodes are integers indexing into the `level`, `low` and `high` lists;
+    0 and 1 are the FALSE and TRUE terminals. A unique table guarantees
+    that every function is represented by exactly one node, so equivalence
+    is a comparison of integers, and the apply cache ensures that each
+    pair of nodes is combined only once per operation.
+    """
+
+    def __init__(self, order=()):
+
+        # Variable order: level of each symbol name and name at each level
+        self.order = []
+        self.levels = dict()
+
+        # Node table, with the terminals below every variable
+        self.level = [float("inf"), float("inf")]
+        self.low = [None, None]
+        self.high = [None, None]
+        self.unique = dict()
+
+        # Operation caches
+        self.cache = dict()
+        self.not_cache = dict()
+
+        for name in order:
+            self.add_var(name)
+
+    def __len__(self):
+        """Returns the number of nodes in the table, terminals included."""
+        return len(self.level)
+
+    def add_var(self, name):
+        """Appends a variable to the bottom of the order."""
+        if name not in self.levels:
+            self.levels[name] = len(self.order)
+            self.order.append(name)
+        return self.levels[name]
+
+    def node(self, level, low, high):
+        """Returns the unique node testing `level`, with given children."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        u = self.unique.get(key)
+        if u is None:
+            u = len(self.level)
+            self.level.append(level)
+            self.low.append(low)
+            self.high.append(high)
+            self.unique[key] = u
+        return u
+
+    def var(self, name):
+        """Returns the node for the single symbol `name`."""
+        return self.node(self.add_var(name), FALSE, TRUE)
+
+    def negate(self, u):
+        """Returns the node for the negation of `u`."""
+        # Nodes are negated children first, with an explicit stack, as
+        # diagrams can be deeper than Python's recursion limit
+        stack = [u]
+        while stack:
+            w = stack[-1]
+            if w <= TRUE or w in self.not_cache:
+                stack.pop()
+                continue
+            low, high = self.low[w], self.high[w]
+            missing = [c for c in (low, high)
+                       if c > TRUE and c not in self.not_cache]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            self.not_cache[w] = self.node(self.level[w],
+                                          self._negated(low),
+                                          self._negated(high))
+        return self._negated(u)
+
+    def _negated(self, u):
+        """Returns the negation of a terminal or already negated node."""
+        return 1 - u if u <= TRUE else self.not_cache[u]
+
+    def terminal(self, op, u, v):
+        """
+        Returns the result of combining `u` and `v` with `op` if it
+        follows without expanding them, or None.
+        """
+        if op == "and":
+            if u == FALSE or v == FALSE:
+                return FALSE
+            if u == TRUE or u == v:
+                return v
+            if v == TRUE:
+                return u
+        elif op == "or":
+            if u == TRUE or v == TRUE:
+                return TRUE
+            if u == FALSE or u == v:
+                return v
+            if v == FALSE:
+                return u
+        elif op == "xor":
+            if u == v:
+                return FALSE
+            if u == FALSE:
+                return v
+            if v == FALSE:
+                return u
+            if u == TRUE:
+                return self.negate(v)
+            if v == TRUE:
+                return self.negate(u)
+        else:
+            raise ValueError(f"unknown operation {op}")
+        return None
+
+    def apply(self, op, u, v):
+        """Combines nodes `u` and `v` with `op`: "and", "or" or "xor"."""
+        result = self.terminal(op, u, v)
+        if result is not None:
+            return result
+
+        # Pairs are combined children first, with an explicit stack; all
+        # operations are commutative, so pairs are cached in sorted order
+        stack = [(u, v)]
+        while stack:
+            a, b = stack[-1]
+            key = (op, min(a, b), max(a, b))
+            if key in self.cache:
+                stack.pop()
+                continue
+
+            # Shannon expansion on the topmost variable of either node
+            level = min(self.level[a], self.level[b])
+            a0, a1 = ((self.low[a], self.high[a]) if self.level[a] == level
+                      else (a, a))
+            b0, b1 = ((self.low[b], self.high[b]) if self.level[b] == level
+                      else (b, b))
+            children = []
+            missing = []
+            for x, y in ((a0, b0), (a1, b1)):
+                child = self.terminal(op, x, y)
+                if child is None:
+                    child = self.cache.get((op, min(x, y), max(x, y)))
+                    if child is None:
+                        missing.append((x, y))
+                children.append(child)
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            self.cache[key] = self.node(level, children[0], children[1])
+        return self.cache[(op, min(u, v), max(u, v))]
+
+    def compile(self, sentence):
+        """Returns the node representing a logical sentence."""
+        if isinstance(sentence, Symbol):
+            return self.var(sentence.name)
+        if isinstance(sentence, Not):
+            return self.negate(self.compile(sentence.operand))
+        if isinstance(sentence, And):
+            u = TRUE
+            for conjunct in sentence.conjuncts:
+                u = self.apply("and", u, self.compile(conjunct))
+                if u == FALSE:
+                    break
+            return u
+        if isinstance(sentence, Or):
+            u = FALSE
+            for disjunct in sentence.disjuncts:
+                u = self.apply("or", u, self.compile(disjunct))
+                if u == TRUE:
+                    break
+            return u
+        if isinstance(sentence, Implication):
+            return self.apply("or",
+                              self.negate(self.compile(sentence.antecedent)),
+                              self.compile(sentence.consequent))
+        if isinstance(sentence, Biconditional):
+            return self.negate(self.apply("xor",
+                                          self.compile(sentence.left),
+                                          self.compile(sentence.right)))
+        raise TypeError("must be a logical sentence")
+
+    def restrict(self, u, model):
+        """
+        Returns the node for `u` conditioned on `model`, a dictionary
+        mapping some symbol names to truth values.
+        """
+        assignment = {self.levels[name]: bool(value)
+                      for name, value in model.items()
+                      if name in self.levels}
+        memo = dict()
+
+        def restricted(u):
+            return u if u <= TRUE else memo.get(u)
+
+        stack = [u]
+        while stack:
+            w = stack[-1]
+            if w <= TRUE or w in memo:
+                stack.pop()
+                continue
+            level = self.level[w]
+            if level in assignment:
+                children = [self.high[w] if assignment[level]
+                            else self.low[w]]
+            else:
+                children = [self.low[w], self.high[w]]
+            missing = [c for c in children if restricted(c) is None]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            if level in assignment:
+                memo[w] = restricted(children[0])
+            else:
+                memo[w] = self.node(level, restricted(children[0]),
+                                    restricted(children[1]))
+        return restricted(u)
+
+    def count(self, u):
+        """
+        Returns the number of assignments to all variables in the order
+        that satisfy `u`.
+        """
+        n = len(self.order)
+        memo = {FALSE: 0, TRUE: 1}
+
+        def level(u):
+            return n if u <= TRUE else self.level[u]
+
+        stack = [u]
+        while stack:
+            w = stack[-1]
+            if w in memo:
+                stack.pop()
+                continue
+            low, high = self.low[w], self.high[w]
+            missing = [c for c in (low, high) if c not in memo]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            memo[w] = (memo[low] * 2 ** (level(low) - level(w) - 1)
+                       + memo[high] * 2 ** (level(high) - level(w) - 1))
+        return memo[u] * 2 ** level(u)
+
+    def size(self, u):
+        """Returns the number of nodes reachable from `u`."""
+        seen = set()
+        stack = [u]
+        while stack:
+            u = stack.pop()
+            if u in seen:
+                continue
+            seen.add(u)
+            if u > TRUE:
+                stack.extend([self.low[u], self.high[u]])
+        return len(seen)
+
+    def model(self, u):
+        """Returns one satisfying partial model of `u`, or None."""
+        if u == FALSE:
+            return None
+        model = dict()
+        while u > TRUE:
+            name = self.order[self.level[u]]
+            if self.high[u] != FALSE:
+                model[name] = True
+                u = self.high[u]
+            else:
+                model[name] = False
+                u = self.low[u]
+        return model
+
+
+def ordering(sentence):
+    """
+    Returns the symbol names of `sentence` in order of first appearance,
+    which keeps related symbols close together in the variable order.
+    """
+    order = dict()
+    stack = [sentence]
+    while stack:
+        s = stack.pop()
+        if isinstance(s, Symbol):
+            order.setdefault(s.name, None)
+        elif isinstance(s, Not):
+            stack.append(s.operand)
+        elif isinstance(s, And):
+            stack.extend(reversed(s.conjuncts))
+        elif isinstance(s, Or):
+            stack.extend(reversed(s.disjuncts))
+        elif isinstance(s, Implication):
+            stack.extend([s.consequent, s.antecedent])
+        elif isinstance(s, Biconditional):
+            stack.extend([s.right, s.left])
+    return list(order)
+
+
+class CompiledKnowledge():
+    """
+    Knowledge base compiled once into a BDD, against which entailment,
+    model counting and conditioning take time linear in the diagram size.
+    """
+
+    def __init__(self, knowledge, order=None, bdd=None):
+        self.bdd = bdd or BDD(order or ordering(knowledge))
+        self.root = self.bdd.compile(knowledge)
+        self.symbols = knowledge.symbols()
+
+    def entails(self, query):
+        """Checks if the knowledge base entails `query`."""
+        if isinstance(query, Symbol) and query.name in self.bdd.levels:
+            return self.bdd.restrict(self.root, {query.name: False}) == FALSE
+        q = self.bdd.compile(query)
+        return self.bdd.apply("and", self.root, self.bdd.negate(q)) == FALSE
+
+    def count(self):
+        """Returns the number of models of the knowledge base."""
+        return self.bdd.count(self.root) // 2 ** (
+            len(self.bdd.order) - len(self.symbols)
+        )
+
+    def condition(self, model):
+        """
+        Returns the knowledge base conditioned on `model`, a dictionary
+        of symbol names to truth values, sharing this one's BDD.
+        """
+        conditioned = CompiledKnowledge.__new__(CompiledKnowledge)
+        conditioned.bdd = self.bdd
+        conditioned.root = self.bdd.restrict(self.root, model)
+        conditioned.symbols = self.symbols - set(model)
+        return conditioned
+
+    def satisfiable(self):
+        """Checks if the knowledge base has at least one model."""
+        return self.root != FALSE
+
+
+# Most recently compiled knowledge base, reused by `bdd_check`
+_compiled = dict()
+
+
+def bdd_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, like `model_check`, compiling
+    the knowledge base only once for a series of queries against it.
+    It is compiled again if its conjuncts have changed since, as when
+    sentences are added with `And.add`.
+    """
+    conjuncts = (tuple(map(id, knowledge.conjuncts))
+                 if isinstance(knowledge, And) else None)
+    compiled = _compiled.get(id(knowledge))
+    if compiled is None or compiled[0] is not knowledge \
+            or compiled[1] != conjuncts:
+        _compiled.clear()
+        compiled = (knowledge, conjuncts, CompiledKnowledge(knowledge))
+        _compiled[id(knowledge)] = compiled
+    return compiled[2].entails(query)
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python bdd.py formulas.txt")
+    from parse import load_formulas
+    knowledge = CompiledKnowledge(load_formulas(sys.argv[1]))
+    print(f"{knowledge.count()} models, "
+          f"{knowledge.bdd.size(knowledge.root)} nodes")
+    for symbol in sorted(knowledge.symbols):
+        if knowledge.entails(Symbol(symbol)):
+            print(f"    {symbol}")
+
+
+if __name__ == "__main__":
+    main()
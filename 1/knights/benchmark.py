@@ -0,0 +1,75 @@
+import json
+import sys
+import time
+
+from logic import *
+from bdd import bdd_check
+from generate import generate_puzzle, sentence_size
+
+# Entailment backends: each takes (knowledge, query) and returns a bool
+BACKENDS = {
+    "model_check": model_check,
+    "bdd": bdd_check,
+}
+
+SIZES = [1, 2, 3, 4, 5, 6]
+DEPTH = 3
+SEED = 0
+
+
+def benchmark(sizes, depth=DEPTH, seed=SEED, backends=None):
+    """
+    Times every backend in `backends` on a generated puzzle for each
+    number of speakers in `sizes`, querying every Knight/Knave symbol.
+
+    Returns a list of result records, one per (size, backend) pair.
+    """
+    backends = backends or BACKENDS
+    results = []
+    for n in sizes:
+        knowledge, symbols, solution = generate_puzzle(n, depth, seed=seed)
+        answers = dict()
+        for backend, entails in backends.items():
+            start = time.perf_counter()
+            entailed = [symbol.name for symbol in symbols
+                        if entails(knowledge, symbol)]
+            elapsed = time.perf_counter() - start
+            answers[backend] = entailed
+
+            # Every entailed symbol must hold in the hidden assignment
+            if any(not solution[name] for name in entailed):
+                raise Exception(f"{backend} entailed a false symbol")
+
+            results.append({
+                "speakers": n,
+                "backend": backend,
+                "symbols": len(knowledge.symbols()),
+                "sentence_size": sentence_size(knowledge),
+                "queries": len(symbols),
+                "entailed": len(entailed),
+                "seconds": elapsed,
+                "seconds_per_query": elapsed / len(symbols)
+            })
+
+        # All backends must agree with each other
+        if len({tuple(entailed) for entailed in answers.values()}) > 1:
+            raise Exception(f"backends disagree on puzzle with {n} speakers")
+    return results
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python benchmark.py [max_speakers] [output.json]")
+    sizes = SIZES
+    if len(sys.argv) >= 2:
+        sizes = list(range(1, int(sys.argv[1]) + 1))
+    results = benchmark(sizes)
+    if len(sys.argv) == 3:
+        with open(sys.argv[2], "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
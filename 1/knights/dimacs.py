@@ -0,0 +1,200 @@
+import sys
+
+from logic import *
+
+# Width reserved for the "p cnf" header, filled in once counts are known
+HEADER_WIDTH = 40
+
+
+def iter_dimacs(f, names=None):
+    """
+    Lazily reads a DIMACS CNF file object, yielding each clause as a
+    list of nonzero integer literals. Clauses may span several lines.
+
+    If `names` is a dictionary, every "c symbol <var> <name>" comment
+    (as written by `write_dimacs`) is recorded in it as var -> name.
+    """
+    clause = []
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] == "c":
+            parts = line.split(None, 3)
+            if names is not None and len(parts) == 4 and parts[1] == "symbol":
+                names[int(parts[2])] = parts[3]
+            continue
+        if line[0] == "p":
+            continue
+
+        # SATLIB benchmark files end with a "%" line
+        if line[0] == "%":
+            break
+        for literal in map(int, line.split()):
+            if literal == 0:
+                yield clause
+                clause = []
+            else:
+                clause.append(literal)
+    if clause:
+        yield clause
+
+
+def read_dimacs(filename):
+    """
+    Loads a DIMACS CNF file as a flat And of Or clauses.
+
+    Variables named by "c symbol" comments become Symbols with that
+    name, all others are named by their variable number. Each Symbol is
+    created once and shared by every clause that mentions it.
+    """
+    names = dict()
+    symbols = dict()
+
+    def literal(number):
+        var = abs(number)
+        if var not in symbols:
+            symbols[var] = Symbol(names.get(var, str(var)))
+        return symbols[var] if number > 0 else Not(symbols[var])
+
+    knowledge = And()
+    with open(filename, encoding="utf-8") as f:
+        for clause in iter_dimacs(f, names):
+            knowledge.add(Or(*[literal(number) for number in clause]))
+    return knowledge
+
+
+def tseitin(sentence, variables, fresh):
+    """
+    Encodes `sentence` as clauses via the Tseitin transformation.
+
+    `variables` maps symbol names to DIMACS variables, `fresh` is a
+    one-element list holding the last variable number used so far, and
+    is advanced for every auxiliary variable introduced.
+    Returns (literal, clauses), where `literal` is equivalent to
+    `sentence` under the returned clauses.
+    """
+    clauses = []
+
+    def new_var():
+        fresh[0] += 1
+        return fresh[0]
+
+    def encode(s):
+        if isinstance(s, Symbol):
+            if s.name not in variables:
+                variables[s.name] = new_var()
+            return variables[s.name]
+        if isinstance(s, Not):
+            return -encode(s.operand)
+        if isinstance(s, (And, Or)):
+            parts = s.conjuncts if isinstance(s, And) else s.disjuncts
+            literals = [encode(part) for part in parts]
+            if len(literals) == 1:
+                return literals[0]
+
+            # Or is encoded as the negation of And over negated parts
+            sign = 1 if isinstance(s, And) else -1
+            literals = [sign * literal for literal in literals]
+            v = new_var()
+            for literal in literals:
+                clauses.append([-v, literal])
+            clauses.append([v] + [-literal for literal in literals])
+            return sign * v
+        if isinstance(s, Implication):
+            a = encode(s.antecedent)
+            b = encode(s.consequent)
+            v = new_var()
+            clauses.extend([[-v, -a, b], [v, a], [v, -b]])
+            return v
+        if isinstance(s, Biconditional):
+            a = encode(s.left)
+            b = encode(s.right)
+            v = new_var()
+            clauses.extend([[-v, -a, b], [-v, a, -b],
+                            [v, a, b], [v, -a, -b]])
+            return v
+        raise TypeError("must be a logical sentence")
+
+    return encode(sentence), clauses
+
+
+def iter_clauses(sentence, variables, fresh):
+    """
+    Yields clauses whose conjunction is equisatisfiable with `sentence`.
+
+    Top-level conjuncts are encoded one at a time, and conjuncts that
+    are already clauses are emitted as-is without auxiliary variables.
+    """
+    conjuncts = [sentence]
+    while conjuncts:
+        s = conjuncts.pop()
+        if isinstance(s, And):
+            conjuncts.extend(reversed(s.conjuncts))
+            continue
+        literals = _clause(s, variables, fresh)
+        if literals is not None:
+            yield literals
+            continue
+        literal, clauses = tseitin(s, variables, fresh)
+        yield from clauses
+        yield [literal]
+
+
+def _clause(s, variables, fresh):
+    """Returns `s` as a list of literals if it is a clause, else None."""
+    parts = s.disjuncts if isinstance(s, Or) else [s]
+    literals = []
+    for part in parts:
+        negated = isinstance(part, Not)
+        if negated:
+            part = part.operand
+        if not isinstance(part, Symbol):
+            return None
+        if part.name not in variables:
+            fresh[0] += 1
+            variables[part.name] = fresh[0]
+        literal = variables[part.name]
+        literals.append(-literal if negated else literal)
+    return literals
+
+
+def write_dimacs(sentence, filename):
+    """
+    Writes `sentence` to `filename` in DIMACS CNF format, naming every
+    original symbol in a "c symbol" comment. Clauses are streamed to
+    disk as they are produced; the header is filled in at the end.
+
+    Returns the dictionary mapping symbol names to variable numbers.
+    """
+    variables = dict()
+    for number, name in enumerate(sorted(sentence.symbols()), 1):
+        variables[name] = number
+    fresh = [len(variables)]
+    count = 0
+    with open(filename, "w", encoding="utf-8") as f:
+        for name, number in variables.items():
+            f.write(f"c symbol {number} {name}\n")
+        header = f.tell()
+        f.write(" " * HEADER_WIDTH + "\n")
+        for clause in iter_clauses(sentence, variables, fresh):
+            f.write(" ".join(str(literal) for literal in clause) + " 0\n")
+            count += 1
+        f.seek(header)
+        f.write(f"p cnf {fresh[0]} {count}".ljust(HEADER_WIDTH))
+    return variables
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python dimacs.py formula.cnf")
+    knowledge = read_dimacs(sys.argv[1])
+    print(f"{len(knowledge.conjuncts)} clauses")
+    if len(knowledge.symbols()) <= 20:
+        for symbol in sorted(knowledge.symbols()):
+            if model_check(knowledge, Symbol(symbol)):
+                print(f"    {symbol}")
+
+
+if __name__ == "__main__":
+    main()
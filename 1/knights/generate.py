@@ -0,0 +1,140 @@
+import random
+import string
+import sys
+
+from logic import *
+
+
+def knight(name):
+    """Returns the symbol stating that character `name` is a knight."""
+    return Symbol(f"{name} is a Knight")
+
+
+def knave(name):
+    """Returns the symbol stating that character `name` is a knave."""
+    return Symbol(f"{name} is a Knave")
+
+
+def character_names(n):
+    """Returns `n` character names: A, B, ..., Z, AA, AB, ..."""
+    names = []
+    for i in range(n):
+        name = ""
+        i += 1
+        while i > 0:
+            i, r = divmod(i - 1, 26)
+            name = string.ascii_uppercase[r] + name
+        names.append(name)
+    return names
+
+
+def sentence_size(sentence):
+    """Returns the number of nodes in the expression tree of `sentence`."""
+    if isinstance(sentence, Symbol):
+        return 1
+    if isinstance(sentence, Not):
+        return 1 + sentence_size(sentence.operand)
+    if isinstance(sentence, And):
+        return 1 + sum(sentence_size(c) for c in sentence.conjuncts)
+    if isinstance(sentence, Or):
+        return 1 + sum(sentence_size(d) for d in sentence.disjuncts)
+    if isinstance(sentence, Implication):
+        return (1 + sentence_size(sentence.antecedent)
+                + sentence_size(sentence.consequent))
+    if isinstance(sentence, Biconditional):
+        return 1 + sentence_size(sentence.left) + sentence_size(sentence.right)
+    raise TypeError("must be a logical sentence")
+
+
+def random_statement(names, depth, rng):
+    """
+    Returns a random claim about the characters in `names`,
+    nested at most `depth` connectives deep.
+    """
+    if depth <= 0 or rng.random() < 0.25:
+        name = rng.choice(names)
+        return knight(name) if rng.random() < 0.5 else knave(name)
+
+    kind = rng.randrange(5)
+    if kind == 0:
+        return Not(random_statement(names, depth - 1, rng))
+    if kind == 1:
+        return And(*[random_statement(names, depth - 1, rng)
+                     for _ in range(rng.randint(2, 3))])
+    if kind == 2:
+        return Or(*[random_statement(names, depth - 1, rng)
+                    for _ in range(rng.randint(2, 3))])
+    if kind == 3:
+        return Implication(random_statement(names, depth - 1, rng),
+                           random_statement(names, depth - 1, rng))
+    return Biconditional(random_statement(names, depth - 1, rng),
+                         random_statement(names, depth - 1, rng))
+
+
+def said(name, statement):
+    """
+    Returns the sentence "`name` said `statement`": the statement holds
+    exactly when the speaker is a knight.
+    """
+    return Biconditional(knight(name), statement)
+
+
+def generate_puzzle(n, depth=3, quotes=0.2, seed=None):
+    """
+    Generates a random knights and knaves puzzle with `n` speakers.
+
+    Every character is secretly assigned a role, then each one makes a
+    random statement of nesting depth at most `depth`; with probability
+    `quotes` the statement instead reports what another character said.
+    Statements that would contradict the secret roles are negated, so the
+    resulting knowledge base is always satisfiable.
+
+    Returns a tuple (knowledge, symbols, solution) where `knowledge` is an
+    And of all constraints, `symbols` lists every Knight/Knave symbol and
+    `solution` maps each symbol name to its role in the hidden assignment.
+    """
+    rng = random.Random(seed)
+    names = character_names(n)
+
+    solution = dict()
+    for name in names:
+        is_knight = rng.random() < 0.5
+        solution[knight(name).name] = is_knight
+        solution[knave(name).name] = not is_knight
+
+    symbols = []
+    knowledge = And()
+    for name in names:
+        symbols.extend([knight(name), knave(name)])
+        knowledge.add(And(Or(knight(name), knave(name)),
+                          Not(And(knight(name), knave(name)))))
+
+    for name in names:
+        statement = random_statement(names, depth, rng)
+        if n > 1 and rng.random() < quotes:
+            other = rng.choice([other for other in names if other != name])
+            statement = said(other, statement)
+        if statement.evaluate(solution) != solution[knight(name).name]:
+            statement = Not(statement)
+        knowledge.add(Implication(knight(name), statement))
+        knowledge.add(Implication(knave(name), Not(statement)))
+
+    return knowledge, symbols, solution
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python generate.py n [seed]")
+    n = int(sys.argv[1])
+    seed = int(sys.argv[2]) if len(sys.argv) == 3 else None
+    knowledge, symbols, solution = generate_puzzle(n, seed=seed)
+    for conjunct in knowledge.conjuncts[n:]:
+        print(conjunct.formula())
+    print("Solution")
+    for symbol in symbols:
+        if solution[symbol.name]:
+            print(f"    {symbol}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import re
+import sys
+
+from logic import *
+
+# One operator, or one symbol name (which may contain inner spaces)
+TOKEN = re.compile(r"\s*(?:(<=>|=>|[()¬∧∨])"
+                   r"|([^()¬∧∨<=\s][^()¬∧∨<=]*))")
+
+
+def tokenize(text):
+    """
+    Splits a formula into a list of tokens. Operators are returned as
+    themselves, symbol names as ("name", name) tuples.
+    """
+    tokens = []
+    pos = 0
+    end = len(text.rstrip())
+    while pos < end:
+        match = TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise ValueError(f"unexpected character at {pos}: {text[pos:]!r}")
+        if match.group(1):
+            tokens.append(match.group(1))
+        else:
+            tokens.append(("name", match.group(2).rstrip()))
+        pos = match.end()
+    return tokens
+
+
+class Parser():
+    """
+    Recursive descent parser for the syntax produced by `formula()`.
+
+    Binding strength, from tightest to loosest: ¬, ∧, ∨, =>, <=>.
+    Implication associates to the right, biconditional to the left.
+    Chains of ∧ or ∨ are collected into one flat And or Or.
+    """
+
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.symbols = dict()
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None
+
+    def next(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("unexpected end of formula")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("empty formula")
+        sentence = self.biconditional()
+        if self.peek() is not None:
+            raise ValueError(f"unexpected token {self.peek()!r}")
+        return sentence
+
+    def biconditional(self):
+        left = self.implication()
+        while self.peek() == "<=>":
+            self.pos += 1
+            left = Biconditional(left, self.implication())
+        return left
+
+    def implication(self):
+        antecedent = self.disjunction()
+        if self.peek() == "=>":
+            self.pos += 1
+            return Implication(antecedent, self.implication())
+        return antecedent
+
+    def disjunction(self):
+        disjuncts = [self.conjunction()]
+        while self.peek() == "∨":
+            self.pos += 1
+            disjuncts.append(self.conjunction())
+        return disjuncts[0] if len(disjuncts) == 1 else Or(*disjuncts)
+
+    def conjunction(self):
+        conjuncts = [self.negation()]
+        while self.peek() == "∧":
+            self.pos += 1
+            conjuncts.append(self.negation())
+        return conjuncts[0] if len(conjuncts) == 1 else And(*conjuncts)
+
+    def negation(self):
+        if self.peek() == "¬":
+            self.pos += 1
+            return Not(self.negation())
+        return self.atom()
+
+    def atom(self):
+        token = self.next()
+        if token == "(":
+            sentence = self.biconditional()
+            if self.next() != ")":
+                raise ValueError("expected ')'")
+            return sentence
+        if isinstance(token, tuple):
+            name = token[1]
+
+            # Reuse one Symbol object per name
+            if name not in self.symbols:
+                self.symbols[name] = Symbol(name)
+            return self.symbols[name]
+        raise ValueError(f"unexpected token {token!r}")
+
+
+def parse(text):
+    """Parses the output of `formula()` back into a Sentence."""
+    return Parser(text).parse()
+
+
+def iter_formulas(f):
+    """
+    Lazily parses a file object holding one formula per line,
+    skipping blank lines and lines starting with "#".
+    """
+    for line in f:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        yield parse(line)
+
+
+def load_formulas(filename):
+    """Loads a file of formulas, one per line, as a single And."""
+    with open(filename, encoding="utf-8") as f:
+        return And(*iter_formulas(f))
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python parse.py formulas.txt")
+    knowledge = load_formulas(sys.argv[1])
+    for symbol in sorted(knowledge.symbols()):
+        if model_check(knowledge, Symbol(symbol)):
+            print(f"    {symbol}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import functools
+import math
+
+
+class LinearSolver():
+    """
+    Global inference over Minesweeper sentences.
+
+    Every sentence is an equation saying that the mine indicators (0 or 1)
+    of its cells add up to its count. The equations are kept in reduced
+    row echelon form with integer coefficients: each row has a pivot cell
+    that appears in no other row. Rows are stored sparsely, as a dictionary
+    from cell to coefficient, together with a column index from each cell
+    to the pivots of the rows mentioning it, so adding an equation or
+    learning a cell only touches the rows that share cells with it.
+
+    Combining equations this way finds conclusions that need several
+    sentences at once, which comparing sentences in pairs misses.
+    """
+
+    def __init__(self):
+
+        # Rows by pivot: (coefficients, right hand side)
+        self.rows = dict()
+
+        # Pivots of all rows mentioning each cell
+        self.columns = dict()
+
+        # Cells known to be mines (True) or safe (False)
+        self.known = dict()
+
+        # Pivots of rows that changed since they were last examined
+        self.changed = set()
+
+    def add(self, cells, count):
+        """Adds the equation saying that `count` of `cells` are mines."""
+        row = dict()
+        for cell in cells:
+            if cell in self.known:
+                count -= self.known[cell]
+            else:
+                row[cell] = 1
+        self.insert(row, count)
+
+    def mark(self, cell, mine):
+        """Substitutes the value of a cell learned to be a mine or safe."""
+        if cell in self.known:
+            return
+        self.known[cell] = mine
+        pivots = self.columns.pop(cell, set())
+        for pivot in pivots - {cell}:
+            row, rhs = self.rows[pivot]
+            rhs -= row.pop(cell) * mine
+            self.rows[pivot] = self.normalize(row, rhs)
+            self.changed.add(pivot)
+
+        # If the cell was a pivot, its row is reduced again from scratch
+        if cell in pivots:
+            row, rhs = self.rows.pop(cell)
+            rhs -= row.pop(cell) * mine
+            for other in row:
+                self.columns[other].discard(cell)
+            self.insert(row, rhs)
+
+    def deduce(self):
+        """
+        Examines every changed row for cells whose value is forced by the
+        bounds 0 <= cell <= 1, substitutes them, and repeats until nothing
+        more follows. Returns the sets of newly known mines and safes.
+        """
+        mines = set()
+        safes = set()
+        while self.changed:
+            pivot = self.changed.pop()
+            if pivot not in self.rows:
+                continue
+            row, rhs = self.rows[pivot]
+
+            # Smallest and largest values the left hand side can take
+            low = sum(a for a in row.values() if a < 0)
+            high = sum(a for a in row.values() if a > 0)
+
+            forced = []
+            for cell, a in row.items():
+                if a > 0:
+                    if low + a > rhs:
+                        forced.append((cell, False))
+                    elif high - a < rhs:
+                        forced.append((cell, True))
+                else:
+                    if high + a < rhs:
+                        forced.append((cell, False))
+                    elif low - a > rhs:
+                        forced.append((cell, True))
+            for cell, mine in forced:
+                if cell not in self.known:
+                    (mines if mine else safes).add(cell)
+                    self.mark(cell, mine)
+        return mines, safes
+
+    def insert(self, row, rhs):
+        """Reduces a row against all pivots and adds it as a new row."""
+
+        # Eliminate existing pivots from the new row
+        for pivot in [cell for cell in row if cell in self.rows]:
+            if pivot in row:
+                row, rhs = self.eliminate(row, rhs, pivot, *self.rows[pivot])
+        if not row:
+            return
+
+        # Pick the pivot that appears in the fewest rows, to limit fill-in
+        pivot = min(row, key=lambda cell: (len(self.columns.get(cell, ())),
+                                           cell))
+        if row[pivot] < 0:
+            row = {cell: -a for cell, a in row.items()}
+            rhs = -rhs
+
+        # Eliminate the new pivot from every other row
+        for other in list(self.columns.get(pivot, ())):
+            old, old_rhs = self.rows[other]
+            for cell in old:
+                self.columns[cell].discard(other)
+            new, new_rhs = self.eliminate(old, old_rhs, pivot, row, rhs)
+            self.rows[other] = (new, new_rhs)
+            for cell in new:
+                self.columns.setdefault(cell, set()).add(other)
+            self.changed.add(other)
+
+        self.rows[pivot] = (row, rhs)
+        for cell in row:
+            self.columns.setdefault(cell, set()).add(pivot)
+        self.changed.add(pivot)
+
+    def eliminate(self, row, rhs, pivot, other, other_rhs):
+        """Returns `row` minus a multiple of `other` without `pivot`."""
+        a = row[pivot]
+        p = other[pivot]
+        result = {cell: b * p for cell, b in row.items()}
+        for cell, b in other.items():
+            value = result.get(cell, 0) - a * b
+            if value:
+                result[cell] = value
+            else:
+                result.pop(cell, None)
+        return self.normalize(result, rhs * p - a * other_rhs)
+
+    @staticmethod
+    def normalize(row, rhs):
+        """Divides a row by the greatest common divisor of its entries."""
+        divisor = functools.reduce(math.gcd, row.values(), abs(rhs))
+        if divisor > 1:
+            row = {cell: a // divisor for cell, a in row.items()}
+            rhs //= divisor
+        return row, rhs
@@ -1,6 +1,10 @@
 import itertools
 import random
-import copy
+
+import numpy as np
+
+from linear import LinearSolver
+from probability import mine_probabilities
 
 class Minesweeper():
     """
@@ -12,27 +16,38 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Choose distinct mine positions at once, rather than retrying
+        # random cells until enough free ones have been hit; the generator
+        # is seeded from `random` so that random.seed() still applies
+        rng = np.random.default_rng(random.getrandbits(64))
+        positions = rng.choice(height * width, mines, replace=False)
+        self.board = np.zeros((height, width), dtype=bool)
+        self.board.flat[positions] = True
+        self._mines = None
+
+        # Count nearby mines for every cell by summing the eight shifted
+        # copies of the zero-padded board (a 3x3 convolution)
+        padded = np.pad(self.board, 1).astype(np.int8)
+        self.counts = np.zeros((height, width), dtype=np.int8)
+        for di in range(3):
+            for dj in range(3):
+                if (di, dj) != (1, 1):
+                    self.counts += padded[di:di + height, dj:dj + width]
 
         # At first, player has found no mines
         self.mines_found = set()
 
+    @property
+    def mines(self):
+        """
+        Set of all cells containing a mine, built on first use.
+        """
+        if self._mines is None:
+            rows, columns = np.nonzero(self.board)
+            self._mines = set(zip(rows.tolist(), columns.tolist()))
+        return self._mines
+
     def print(self):
         """
         Prints a text-based representation
@@ -50,7 +65,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i, j])
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +73,8 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
-
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        i, j = cell
+        return int(self.counts[i, j])
 
     def won(self):
         """
@@ -136,17 +135,207 @@ class Sentence():
         if cell in self.cells:
             self.cells.remove(cell)
 
+
+class BitSentence():
+    """
+    Logical statement about a Minesweeper game, like Sentence, but with
+    its cells stored as the bits of one integer: cell (i, j) is board
+    index i * width + j. Subset tests, differences and marking cells are
+    then a few integer operations instead of set operations on tuples.
+
+    The mask is stored shifted down by `offset`, the index of its lowest
+    cell, so it stays a few words long however large the board is.
+    """
+
+    __slots__ = ("offset", "mask", "count", "width")
+
+    def __init__(self, mask, count, width, offset=0):
+        self.width = width
+        self.count = count
+        self.set_mask(mask, offset)
+
+    @classmethod
+    def from_cells(cls, cells, count, width):
+        indices = [i * width + j for i, j in cells]
+        offset = min(indices, default=0)
+        mask = 0
+        for index in indices:
+            mask |= 1 << (index - offset)
+        return cls(mask, count, width, offset)
+
+    def set_mask(self, mask, offset):
+        if mask:
+            low = (mask & -mask).bit_length() - 1
+            mask >>= low
+            offset += low
+        else:
+            offset = 0
+        self.mask = mask
+        self.offset = offset
+
+    def __eq__(self, other):
+        return (self.mask == other.mask and self.offset == other.offset
+                and self.count == other.count)
+
+    def __len__(self):
+        return bin(self.mask).count("1")
+
+    def __str__(self):
+        return f"{self.cells} = {self.count}"
+
+    def key(self):
+        """Returns a hashable value identifying the sentence's contents."""
+        return (self.offset, self.mask, self.count)
+
+    @property
+    def cells(self):
+        """
+        Set of cells in the sentence, decoded from the mask.
+        """
+        cells = set()
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            index = self.offset + low.bit_length() - 1
+            cells.add(divmod(index, self.width))
+            mask ^= low
+        return cells
+
+    def shifted(self, other):
+        """Returns the mask of `other` aligned with this one's offset."""
+        if other.offset >= self.offset:
+            return other.mask << (other.offset - self.offset)
+        return other.mask >> (self.offset - other.offset)
+
+    def issubset(self, other):
+        """Checks if every cell of this sentence is in `other`."""
+        if self.offset < other.offset:
+            return False
+        return other.shifted(self) & ~other.mask == 0
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells of this one outside `other`,
+        which must be a subset of this sentence.
+        """
+        return BitSentence(self.mask & ~self.shifted(other),
+                           self.count - other.count,
+                           self.width, self.offset)
+
+    def bit(self, cell):
+        i, j = cell
+        index = i * self.width + j - self.offset
+        return 1 << index if index >= 0 else 0
+
+    def known_mines(self):
+        """
+        Returns the set of all cells in self.cells known to be mines.
+        """
+        if self.count == len(self):
+            return self.cells
+        return set()
+
+    def known_safes(self):
+        """
+        Returns the set of all cells in self.cells known to be safe.
+        """
+        if self.count == 0:
+            return self.cells
+        return set()
+
+    def mark_mine(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be a mine.
+        """
+        bit = self.bit(cell)
+        if self.mask & bit:
+            self.set_mask(self.mask ^ bit, self.offset)
+            self.count -= 1
+
+    def mark_safe(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be safe.
+        """
+        bit = self.bit(cell)
+        if self.mask & bit:
+            self.set_mask(self.mask ^ bit, self.offset)
+
+
+class Knowledge():
+    """
+    Set of sentences about a Minesweeper game, indexed by cell so that
+    marking a cell or looking for related sentences only touches the
+    sentences that mention the cells involved.
+
+    Sentences are keyed by their contents, see BitSentence.key. A sentence
+    must be removed before it is modified and added back afterwards.
+    """
+
+    def __init__(self):
+        self.sentences = dict()
+        self.index = dict()
+
+    def __contains__(self, sentence):
+        return sentence.key() in self.sentences
+
+    def __iter__(self):
+        return iter(list(self.sentences.values()))
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def add(self, sentence):
+        """
+        Adds a sentence unless it is empty or already known.
+        Returns True if the sentence was added.
+        """
+        key = sentence.key()
+        if not sentence.mask or key in self.sentences:
+            return False
+        self.sentences[key] = sentence
+        for cell in sentence.cells:
+            self.index.setdefault(cell, set()).add(key)
+        return True
+
+    def remove(self, sentence):
+        """Removes a sentence if it is known."""
+        key = sentence.key()
+        if self.sentences.pop(key, None) is None:
+            return
+        for cell in sentence.cells:
+            keys = self.index[cell]
+            keys.discard(key)
+            if not keys:
+                del self.index[cell]
+
+    def containing(self, cell):
+        """Returns a list of all sentences that mention `cell`."""
+        return [self.sentences[key] for key in self.index.get(cell, ())]
+
+    def overlapping(self, sentence):
+        """Returns a list of all sentences sharing a cell with `sentence`."""
+        keys = set()
+        for cell in sentence.cells:
+            keys.update(self.index.get(cell, ()))
+        return [self.sentences[key] for key in keys]
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Total number of mines on the board, if known
+        self.total_mines = mines
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -154,8 +343,33 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Cells neither clicked on nor known to be mines
+        self.unknown = {
+            (i, j) for i in range(height) for j in range(width)
+        }
+
+        # Sentences about the game known to be true
+        self.knowledge = Knowledge()
+
+        # New or changed sentences that inference has not looked at yet
+        self.pending = []
+
+        # All sentences as one linear system, for conclusions that need
+        # several sentences combined
+        self.solver = LinearSolver()
+
+    def neighbors(self, cell):
+        """
+        Returns the set of cells within one row and column of `cell`
+        that are on the board, not including the cell itself.
+        """
+        i, j = cell
+        return {
+            (x, y)
+            for x in range(max(i - 1, 0), min(i + 2, self.height))
+            for y in range(max(j - 1, 0), min(j + 2, self.width))
+            if (x, y) != cell
+        }
 
     def mark_mine(self, cell):
         """
@@ -163,8 +377,13 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        self.unknown.discard(cell)
+        self.solver.mark(cell, True)
+        for sentence in self.knowledge.containing(cell):
+            self.knowledge.remove(sentence)
             sentence.mark_mine(cell)
+            if self.knowledge.add(sentence):
+                self.pending.append(sentence)
 
     def mark_safe(self, cell):
         """
@@ -172,8 +391,12 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        self.solver.mark(cell, False)
+        for sentence in self.knowledge.containing(cell):
+            self.knowledge.remove(sentence)
             sentence.mark_safe(cell)
+            if self.knowledge.add(sentence):
+                self.pending.append(sentence)
 
     def add_knowledge(self, cell, count):
         """
@@ -190,100 +413,101 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
-        self.moves_made.add(cell)
-        self.mark_safe(cell)
+        self.add_knowledge_batch([(cell, count)])
 
-        def neighbors(cell): # returns physical neighbors in a restricted board max of 8 possible neighbors except for edge cells
-            tmp = {(cell[0]-1, cell[1]-1), (cell[0]-1, cell[1]), (cell[0]-1, cell[1]+1), (cell[0], cell[1]+1), (cell[0]+1, cell[1]+1), (cell[0]+1, cell[1]), (cell[0]+1, cell[1]-1), (cell[0], cell[1]-1)}
-            res = set()
-            for tmp_cell in tmp:
-                i = tmp_cell[0]
-                j = tmp_cell[1]
+    def add_knowledge_batch(self, cells_counts):
+        """
+        Adds knowledge for several revealed cells at once, such as all
+        the cells uncovered by one click, given as (cell, count) pairs.
 
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    res.add(tmp_cell)
+        Every cell is marked safe before any sentence is built, so the
+        sentences leave out cells revealed in the same batch, and
+        inference runs a single time for the whole batch.
+        """
+        cells_counts = list(cells_counts)
+        for cell, count in cells_counts:
+            self.moves_made.add(cell)
+            self.unknown.discard(cell)
+            self.mark_safe(cell)
+
+        for cell, count in cells_counts:
+
+            # only keep the neighbors whose state is still unknown
+            cells = set()
+            for neighbor in self.neighbors(cell):
+                if neighbor in self.mines:
+                    count -= 1
+                elif neighbor not in self.safes:
+                    cells.add(neighbor)
+
+            self.solver.add(cells, count)
+            sentence = BitSentence.from_cells(cells, count, self.width)
+            if self.knowledge.add(sentence):
+                self.pending.append(sentence)
+
+        self.infer()
+        self.solve()
+
+    def infer(self):
+        """
+        Draws every conclusion that follows from the pending sentences,
+        until no new sentence or known cell can be derived.
 
-            return res 
-        
-        tmp = neighbors(cell)
-        # copy of the knowledge 
-        # avoid : RuntimeError: Set changed size during iteration
-        tmpCopy = copy.deepcopy(tmp)
-
-        for tmp_cell in tmpCopy:
-            if tmp_cell in self.mines:
-                tmp.remove(tmp_cell)
-                count -= 1
-            elif tmp_cell in self.safes:
-                tmp.remove(tmp_cell)
-
-        # check if newSentence is necessary: either empty sentence or already in the knowledge base
-        nwSentence = Sentence(tmp, count)
-        if not(tmp==set() and count==0) and not nwSentence in self.knowledge:
-            self.knowledge.append(nwSentence)
-
-        #update knowledge base
-        #untill saturation
-        flag = True # keep checking untill becomes false when it is saturated
-        while flag:
-            flag = False
-            # avoid : RuntimeError: Set changed size during iteration
-            
-            #initial buffers
-            mineSetList = []
-            safeSetList = []
-            for sentence in self.knowledge:
-                anyMines = sentence.known_mines()
-                anySafes = sentence.known_safes()
-                if anyMines != set():
-                    flag = True #change & update
-                    mineSetList.append(anyMines) #fill buffer
-                elif anySafes != set():
-                    flag = True #change & update
-                    safeSetList.append(anySafes) #fill buffer
-            #flush buffer
-            for mineSet in mineSetList:
-                minesetCopy = copy.deepcopy(mineSet)
-                for mine in minesetCopy:
-                    self.mark_mine(mine)    
-            for safeSet in safeSetList:
-                safesetCopy = copy.deepcopy(safeSet)
-                for safe in safesetCopy:
-                    self.mark_safe(safe)
-            
-            # simplify knowledge : remove empty
-            sentRmv = [] # buffer for empty sentences
-            for sentence in self.knowledge:
-                if sentence.cells == set() and sentence.count == 0:
-                    sentRmv.append(sentence) # record empty sentences
-            # remove empty sentences
-            for sentence in sentRmv:
-                if sentence in self.knowledge:
-                    self.knowledge.remove(sentence)
-
-            sentRmv = []
-            sentAdd = []
-            for sentence1 in self.knowledge:
-                for sentence2 in self.knowledge:
-                    if sentence1 != sentence2:
-                        if sentence1.cells.issubset(sentence2.cells):
-                            flag = True #change & update
-                            diffCells = sentence2.cells.difference(sentence1.cells)
-                            diffCount = sentence2.count - sentence1.count
-                            # keep sets not a subset of each other, linear algebra, avoid infinite loops
-                            sentRmv.append(sentence2)
-                            # add newSentence
-                            nwSentence = Sentence(diffCells, diffCount)
-                            sentAdd.append(nwSentence)
-            # remove sentences/avoid unnecessary info/keep linearly independent                
-            for sentence in sentRmv:
-                if sentence in self.knowledge:
-                    self.knowledge.remove(sentence)
-            # add sentences/new inferences
-            for sentence in sentAdd:
-                # check if newSentence is necessary: either empty sentence or already in the knowledge base or already removed
-                if not (sentence.cells == set() and sentence.count == 0) and not sentence in self.knowledge and not sentence in sentRmv:
-                    self.knowledge.append(sentence)
+        Only sentences sharing a cell with a changed sentence are compared,
+        so the work done depends on the size of the change rather than on
+        the size of the whole knowledge base.
+        """
+        while self.pending:
+            sentence = self.pending.pop()
+
+            # skip sentences that were changed or dropped since queued
+            if sentence not in self.knowledge:
+                continue
+
+            # marking cells updates and queues every sentence containing them
+            if sentence.known_mines():
+                for cell in list(sentence.cells):
+                    self.mark_mine(cell)
+                continue
+            if sentence.known_safes():
+                for cell in list(sentence.cells):
+                    self.mark_safe(cell)
+                continue
+
+            # subset rule: replace the larger sentence by the difference,
+            # keeping the knowledge base free of subset pairs
+            for other in self.knowledge.overlapping(sentence):
+                # equal sizes cannot be strict subsets (this skips itself too)
+                if len(other) == len(sentence):
+                    continue
+                if other.issubset(sentence):
+                    smaller, larger = other, sentence
+                elif sentence.issubset(other):
+                    smaller, larger = sentence, other
+                else:
+                    continue
+                self.knowledge.remove(larger)
+                inferred = larger.difference(smaller)
+                if self.knowledge.add(inferred):
+                    self.pending.append(inferred)
+                if larger is sentence:
+                    break
+
+    def solve(self):
+        """
+        Marks every cell the linear system proves to be a mine or safe,
+        and draws the conclusions that follow, until neither the system
+        nor the sentences yield anything new.
+        """
+        while True:
+            mines, safes = self.solver.deduce()
+            if not mines and not safes:
+                return
+            for cell in mines:
+                self.mark_mine(cell)
+            for cell in safes:
+                self.mark_safe(cell)
+            self.infer()
 
     def make_safe_move(self):
         """
@@ -307,21 +531,22 @@ class MinesweeperAI():
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
-        Should choose randomly among cells that:
+        Chooses among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        the one least likely to be a mine given the knowledge base,
+        breaking ties at random.
         """
-        bag = []
-
-        for i in range(0, self.height):
-            for j in range(0, self.width):
-                move = (i, j)
-                if not move in self.moves_made and not move in self.mines:
-                    bag.append(move)
-        if bag == []:            
-        # if move not possible: either no moves are left that might be a safe cell
+        # if move not possible: no moves are left that might be a safe cell
+        if not self.unknown:
             return None
-        else:
-            random.seed()
-            index = random.randint(0, len(bag))
-            return bag[index]
+
+        mines_left = None
+        if self.total_mines is not None:
+            mines_left = self.total_mines - len(self.mines)
+        probabilities = mine_probabilities(self.knowledge, self.unknown,
+                                           mines_left)
+        lowest = min(probabilities.values())
+        return random.choice([
+            cell for cell, p in probabilities.items() if p <= lowest + 1e-9
+        ])
@@ -0,0 +1,249 @@
+import bisect
+import math
+
+
+def components(sentences):
+    """
+    Splits `sentences` into groups that share no cells, since the mines
+    in one group tell us nothing about the cells in another.
+    Returns a list of (cells, sentences) pairs.
+    """
+    parent = dict()
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for sentence in sentences:
+        cells = list(sentence.cells)
+        for cell in cells:
+            parent.setdefault(cell, cell)
+        root = find(cells[0])
+        for cell in cells[1:]:
+            other = find(cell)
+            if other != root:
+                parent[other] = root
+
+    groups = dict()
+    for sentence in sentences:
+        root = find(next(iter(sentence.cells)))
+        groups.setdefault(root, (set(), []))
+        groups[root][0].update(sentence.cells)
+        groups[root][1].append(sentence)
+    return list(groups.values())
+
+
+def ordering(cells, sentences):
+    """
+    Orders `cells` breadth first through shared sentences, so that each
+    sentence is opened and closed within a short stretch of the order.
+    """
+    neighbors = {cell: set() for cell in cells}
+    for sentence in sentences:
+        for cell in sentence.cells:
+            neighbors[cell].update(sentence.cells)
+
+    order = []
+    seen = set()
+    for start in sorted(cells):
+        if start in seen:
+            continue
+        seen.add(start)
+        queue = [start]
+        while queue:
+            cell = queue.pop(0)
+            order.append(cell)
+            for neighbor in sorted(neighbors[cell] - seen):
+                seen.add(neighbor)
+                queue.append(neighbor)
+    return order
+
+
+def add(p, q, shift=0):
+    """Adds polynomial `q`, multiplied by x**shift, into polynomial `p`."""
+    if len(p) < len(q) + shift:
+        p.extend([0] * (len(q) + shift - len(p)))
+    for k, c in enumerate(q):
+        p[k + shift] += c
+
+
+def multiply(p, q):
+    """Returns the product of polynomials `p` and `q`."""
+    result = [0] * (len(p) + len(q) - 1)
+    for i, a in enumerate(p):
+        if a:
+            for j, b in enumerate(q):
+                result[i + j] += a * b
+    return result
+
+
+def enumerate_component(cells, sentences):
+    """
+    Counts the mine assignments to `cells` consistent with `sentences`.
+
+    Returns (total, marginals): `total[k]` is the number of consistent
+    assignments placing exactly k mines, and `marginals[cell][k]` the
+    number of those in which `cell` is a mine.
+
+    Cells are assigned one at a time in a fixed order. Partial assignments
+    leaving the same number of mines still needed by every sentence behave
+    identically from then on, so they are merged into a single state whose
+    value is a polynomial counting assignments by number of mines.
+    A forward pass counts the ways to reach each state, a backward pass
+    the ways to complete it.
+    """
+    order = ordering(cells, sentences)
+    n = len(order)
+    position = {cell: i for i, cell in enumerate(order)}
+
+    # Sentences containing each cell, and cells of each sentence left
+    # unassigned after each position
+    touching = [[] for _ in range(n)]
+    last = []
+    for c, sentence in enumerate(sentences):
+        positions = sorted(position[cell] for cell in sentence.cells)
+        for i in positions:
+            touching[i].append(c)
+        last.append(positions)
+
+    def remaining(c, i):
+        """Number of cells of sentence `c` at position `i` or later."""
+        positions = last[c]
+        return len(positions) - bisect.bisect_left(positions, i)
+
+    def step(state, i, mine):
+        """Returns the state after assigning cell i, or None if invalid."""
+        if not mine:
+            for c in touching[i]:
+                if state[c] > remaining(c, i + 1):
+                    return None
+            return state
+        state = list(state)
+        for c in touching[i]:
+            state[c] -= 1
+            if state[c] < 0:
+                return None
+        return tuple(state)
+
+    # Forward pass: ways to reach each state, by mines placed so far
+    start = tuple(sentence.count for sentence in sentences)
+    forward = [{start: [1]}]
+    for i in range(n):
+        layer = dict()
+        for state, ways in forward[i].items():
+            for mine in (0, 1):
+                following = step(state, i, mine)
+                if following is not None:
+                    add(layer.setdefault(following, []), ways, mine)
+        forward.append(layer)
+
+    # Backward pass: ways to complete each reachable state
+    done = tuple(0 for _ in sentences)
+    backward = [dict() for _ in range(n)] + [{done: [1]}]
+    for i in range(n - 1, -1, -1):
+        for state in forward[i]:
+            ways = []
+            for mine in (0, 1):
+                following = step(state, i, mine)
+                if following in backward[i + 1]:
+                    add(ways, backward[i + 1][following], mine)
+            if ways:
+                backward[i][state] = ways
+
+    total = backward[0].get(start, [0])
+    marginals = dict()
+    for i, cell in enumerate(order):
+        mines = [0]
+        for state, ways in forward[i].items():
+            following = step(state, i, 1)
+            if state in backward[i] and following in backward[i + 1]:
+                add(mines, multiply(ways, backward[i + 1][following]), 1)
+        marginals[cell] = mines
+    return total, marginals
+
+
+def mine_probabilities(sentences, unknown, mines_left=None):
+    """
+    Returns a dictionary mapping every cell in `unknown` to the
+    probability that it is a mine, given the knowledge in `sentences`.
+
+    Every consistent placement of the remaining mines is equally likely.
+    Cells not mentioned by any sentence are interchangeable, so only the
+    number of mines among them matters. If `mines_left` is None, the
+    groups of sentences are treated as independent and cells outside
+    them get the average probability of the cells inside.
+    """
+    groups = [enumerate_component(cells, group)
+              for cells, group in components(
+                  [s for s in sentences if s.cells])]
+    frontier = set()
+    for _, marginals in groups:
+        frontier.update(marginals)
+    interior = len(unknown) - len(frontier)
+
+    probabilities = dict()
+    if mines_left is None:
+        for total, marginals in groups:
+            count = sum(total)
+            for cell, mines in marginals.items():
+                probabilities[cell] = sum(mines) / count if count else 0
+        default = (sum(probabilities.values()) / len(probabilities)
+                   if probabilities else 0.5)
+        for cell in unknown:
+            probabilities.setdefault(cell, default)
+        return probabilities
+
+    # Relative number of ways to place the remaining mines among the
+    # interior cells if k of them are on the frontier, kept in float range
+    logs = [_log_comb(interior, mines_left - k)
+            if 0 <= mines_left - k <= interior else None
+            for k in range(len(frontier) + 1)]
+    offset = max([log for log in logs if log is not None], default=0)
+    weights = [math.exp(log - offset) if log is not None else 0
+               for log in logs]
+
+    # Mines placed by all groups but one, for each group
+    totals = [_scale(total) for total, _ in groups]
+    prefix = [[1.0]]
+    for total in totals:
+        prefix.append(multiply(prefix[-1], total))
+    suffix = [[1.0]]
+    for total in reversed(totals):
+        suffix.append(multiply(suffix[-1], total))
+    suffix.reverse()
+
+    everything = prefix[-1]
+    denominator = sum(ways * weights[k] for k, ways in enumerate(everything))
+    if denominator == 0:
+        return {cell: 1.0 for cell in unknown}
+
+    for g, (total, marginals) in enumerate(groups):
+        others = multiply(prefix[g], suffix[g + 1])
+        scale = max(total) if any(total) else 1
+        for cell, mines in marginals.items():
+            mines = [m / scale for m in mines]
+            numerator = sum(ways * weights[k]
+                            for k, ways in enumerate(multiply(mines, others)))
+            probabilities[cell] = numerator / denominator
+
+    if interior:
+        expected = sum(ways * weights[k] * (mines_left - k) / interior
+                       for k, ways in enumerate(everything))
+        for cell in unknown:
+            if cell not in frontier:
+                probabilities[cell] = expected / denominator
+    return probabilities
+
+
+def _scale(total):
+    """Returns the polynomial `total` as floats relative to its maximum."""
+    scale = max(total) if any(total) else 1
+    return [ways / scale for ways in total]
+
+
+def _log_comb(n, k):
+    """Returns the natural logarithm of n choose k."""
+    return (math.lgamma(n + 1) - math.lgamma(k + 1)
+            - math.lgamma(n - k + 1))
@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import random
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def play(height, width, mines, seed):
+    """
+    Plays one game of Minesweeper with the AI, without a display.
+
+    Revealing a cell with no nearby mines also reveals all of its
+    neighbors, as the game interface does, and the AI is told about
+    all cells revealed by a move in one batch.
+
+    Returns a dictionary with the outcome, the number of moves the AI
+    chose, the number of cells revealed and the seconds the AI spent
+    on each move.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, mines=mines)
+    revealed = set()
+    times = []
+
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if move is None:
+            # Judged by the real board, not the AI's view of it
+            won = len(revealed) == height * width - len(game.mines)
+            break
+        if game.is_mine(move):
+            times.append(time.perf_counter() - start)
+            won = False
+            break
+
+        # Reveal the move, flooding outwards from cells with no nearby mines
+        batch = []
+        frontier = [move]
+        while frontier:
+            cell = frontier.pop()
+            if cell in revealed:
+                continue
+            revealed.add(cell)
+            nearby = game.nearby_mines(cell)
+            batch.append((cell, nearby))
+            if nearby == 0:
+                frontier.extend(
+                    neighbor for neighbor in ai.neighbors(cell)
+                    if neighbor not in revealed
+                )
+        ai.add_knowledge_batch(batch)
+        times.append(time.perf_counter() - start)
+
+    return {
+        "won": won,
+        "moves": len(times),
+        "revealed": len(revealed),
+        "times": times
+    }
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """Returns the given percentiles of `values`, by nearest rank."""
+    values = sorted(values)
+    result = dict()
+    for point in points:
+        if not values:
+            result[f"p{point}"] = None
+            continue
+        rank = max(int(round(point / 100 * len(values))) - 1, 0)
+        result[f"p{point}"] = values[min(rank, len(values) - 1)]
+    return result
+
+
+def simulate(games, height, width, mines, seed=0, workers=None):
+    """
+    Plays `games` games across a pool of `workers` processes, game i
+    being seeded with `seed` + i, and summarizes the results.
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            play,
+            [height] * games, [width] * games, [mines] * games,
+            range(seed, seed + games),
+            chunksize=max(games // (4 * workers), 1)
+        ))
+    elapsed = time.perf_counter() - start
+
+    times = [t for result in results for t in result["times"]]
+    return {
+        "games": games,
+        "height": height,
+        "width": width,
+        "mines": mines,
+        "win_rate": sum(result["won"] for result in results) / games,
+        "moves_per_game": percentiles(
+            [result["moves"] for result in results]),
+        "seconds_per_move": percentiles(times),
+        "moves": len(times),
+        "seconds": elapsed,
+        "games_per_second": games / elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play many headless games of Minesweeper with the AI.")
+    parser.add_argument("games", type=int, nargs="?", default=1000)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    mines = parser.add_mutually_exclusive_group()
+    mines.add_argument("--mines", type=int)
+    mines.add_argument("--density", type=float,
+                       help="fraction of cells that are mines")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int,
+                        help="number of processes (default: all CPUs)")
+    args = parser.parse_args()
+
+    if args.mines is not None:
+        count = args.mines
+    elif args.density is not None:
+        count = round(args.density * args.height * args.width)
+    else:
+        count = 8
+    print(json.dumps(simulate(args.games, args.height, args.width, count,
+                              args.seed, args.workers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
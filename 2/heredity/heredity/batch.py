@@ -0,0 +1,117 @@
+import csv
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import elimination
+import gray
+import junction
+import vectorized
+from heredity import load_data
+
+METHODS = {
+    "elimination": elimination.marginals,
+    "gray": gray.marginals,
+    "junction": junction.marginals,
+    "vectorized": vectorized.marginals
+}
+
+FIELDS = ["family", "person", "gene_2", "gene_1", "gene_0",
+          "trait_true", "trait_false", "seconds", "failure"]
+
+
+def family_files(source):
+    """
+    Returns the family files named by `source`: every CSV file in it if
+    it is a directory, otherwise every file matching it as a glob, in
+    sorted order.
+    """
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "*.csv")))
+    return sorted(glob.glob(source))
+
+
+def check_family(people):
+    """
+    Raises ValueError if `people` is empty, or if someone has only one
+    parent or a parent who is not in the family.
+    """
+    if not people:
+        raise ValueError("no people")
+    for name, person in people.items():
+        parents = [person["mother"], person["father"]]
+        if parents.count(None) == 1:
+            raise ValueError(f"{name} has only one parent")
+        for parent in parents:
+            if parent is not None and parent not in people:
+                raise ValueError(f"{name}'s parent {parent} is unknown")
+
+
+def score(filename, method="elimination"):
+    """
+    Returns the rows of the output for one family file: one per person,
+    with their marginals and the seconds the family took. If the family
+    cannot be loaded or scored, returns a single row with the error in
+    its failure column instead of raising.
+    """
+    start = time.perf_counter()
+    try:
+        people = load_data(filename)
+        check_family(people)
+        probabilities = METHODS[method](people)
+    except Exception as e:
+        return [{"family": filename,
+                 "seconds": time.perf_counter() - start,
+                 "failure": f"{type(e).__name__}: {e}"}]
+    seconds = time.perf_counter() - start
+    return [{"family": filename, "person": person,
+             "gene_2": p["gene"][2], "gene_1": p["gene"][1],
+             "gene_0": p["gene"][0], "trait_true": p["trait"][True],
+             "trait_false": p["trait"][False], "seconds": seconds}
+            for person, p in probabilities.items()]
+
+
+def run(filenames, output, method="elimination", workers=None):
+    """
+    Scores every file in `filenames` in a pool of `workers` processes
+    (by default one per CPU) and writes the rows of each family to the
+    CSV file `output` as soon as it is done, so families finish in any
+    order and a long run can be followed as it goes.
+
+    Returns the numbers of families scored and of families that failed.
+    """
+    scored = failed = 0
+    with open(output, "w", newline="") as f, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        f.flush()
+        futures = [executor.submit(score, filename, method)
+                   for filename in filenames]
+        for future in as_completed(futures):
+            rows = future.result()
+            writer.writerows(rows)
+            f.flush()
+            if rows[0].get("failure"):
+                failed += 1
+            else:
+                scored += 1
+    return scored, failed
+
+
+def main():
+    method = sys.argv[3] if len(sys.argv) == 4 else "elimination"
+    if len(sys.argv) not in (3, 4) or method not in METHODS:
+        sys.exit("Usage: python batch.py (directory|glob) output.csv "
+                 f"[{'|'.join(METHODS)}]")
+    filenames = family_files(sys.argv[1])
+    if not filenames:
+        sys.exit(f"No family files match {sys.argv[1]}")
+    scored, failed = run(filenames, sys.argv[2], method)
+    print(f"{scored} families scored, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import itertools
+import sys
+
+import numpy as np
+
+from heredity import (PROBS, inheritance_table, load_data,
+                      print_probabilities)
+
+
+class Factor():
+    """
+    A function of some gene variables, as a NumPy array with one axis of
+    length 3 (zero, one or two copies) per variable in `variables`.
+    Variables are named after the person they belong to.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = np.asarray(table, dtype=float)
+
+
+def gene_tables(probs=PROBS):
+    """
+    Returns the prior over a parentless person's genes, the probability
+    of a child's genes given the mother's and the father's (indexed
+    [mother, father, child]), and the probability of the trait given
+    genes (indexed [genes, trait], with False first), all from `probs`.
+    """
+    prior = np.array([probs["gene"][g] for g in range(3)])
+    inheritance = np.array(inheritance_table(probs))
+    trait = np.array([[probs["trait"][g][False], probs["trait"][g][True]]
+                      for g in range(3)])
+    return prior, inheritance, trait
+
+
+def family_factors(people, probs=PROBS):
+    """
+    Returns the factors of the joint distribution of everyone's genes
+    and known traits: per person, the prior or the inheritance table
+    from their parents, times the probability of their trait if known.
+    Unknown traits sum out to 1 and are left out.
+    """
+    prior, inheritance, trait = gene_tables(probs)
+    factors = []
+    for name, person in people.items():
+        if person["mother"] is None:
+            factors.append(Factor([name], prior))
+        else:
+            factors.append(Factor(
+                [person["mother"], person["father"], name], inheritance))
+        if person["trait"] is not None:
+            factors.append(Factor([name], trait[:, int(person["trait"])]))
+    return factors
+
+
+def multiply(a, b):
+    """Returns the product of factors `a` and `b`, over both's variables."""
+    variables = list(a.variables)
+    variables += [v for v in b.variables if v not in variables]
+    axis = {v: i for i, v in enumerate(variables)}
+    table = np.einsum(a.table, [axis[v] for v in a.variables],
+                      b.table, [axis[v] for v in b.variables],
+                      list(range(len(variables))))
+    return Factor(variables, table)
+
+
+def multiply_out(factors, variable):
+    """
+    Returns the product of `factors` with `variable` summed out.
+
+    The factors are multiplied two at a time, as einsum takes a limited
+    number of operands, and the result is scaled so its largest entry
+    is 1: marginals are normalized in the end, and products of many
+    small probabilities would otherwise underflow to 0.
+    """
+    result = factors[0]
+    for factor in factors[1:]:
+        result = multiply(result, factor)
+    axis = result.variables.index(variable)
+    table = result.table.sum(axis=axis)
+    top = table.max()
+    if top > 0:
+        table = table / top
+    return Factor(result.variables[:axis] + result.variables[axis + 1:],
+                  table)
+
+
+def min_fill_order(factors, keep=()):
+    """
+    Returns an elimination order for every variable but those in `keep`.
+
+    Variables are neighbours when a factor mentions both. The next
+    variable eliminated is the one whose neighbours need the fewest new
+    edges to become a clique (ties broken by fewest neighbours, then by
+    name), and it is then removed with its neighbours joined up.
+    """
+    neighbours = dict()
+    for factor in factors:
+        for v in factor.variables:
+            neighbours.setdefault(v, set()).update(factor.variables)
+    for v in neighbours:
+        neighbours[v].discard(v)
+
+    def fill(v):
+        near = list(neighbours[v])
+        return sum(1 for i, a in enumerate(near) for b in near[i + 1:]
+                   if b not in neighbours[a])
+
+    order = []
+    remaining = set(neighbours) - set(keep)
+    while remaining:
+        v = min(remaining, key=lambda v: (fill(v), len(neighbours[v]), v))
+        near = neighbours.pop(v)
+        for a in near:
+            neighbours[a].discard(v)
+            neighbours[a].update(near - {a})
+        remaining.discard(v)
+        order.append(v)
+    return order
+
+
+def eliminate(factors, order):
+    """
+    Sums the variables in `order` out of the product of `factors`, one at
+    a time, and returns the factors left over, up to a constant.
+    """
+    factors = dict(enumerate(factors))
+    new_keys = itertools.count(len(factors))
+
+    # Keys of the factors mentioning each variable
+    mentions = dict()
+    for key, factor in factors.items():
+        for v in factor.variables:
+            mentions.setdefault(v, set()).add(key)
+
+    for variable in order:
+        keys = mentions.pop(variable, set())
+        if not keys:
+            continue
+        bucket = [factors.pop(key) for key in keys]
+        for factor in bucket:
+            for v in factor.variables:
+                if v != variable:
+                    mentions[v] -= keys
+        factor = multiply_out(bucket, variable)
+
+        # A constant only scales the result, which is normalized anyway
+        if not factor.variables:
+            continue
+        key = next(new_keys)
+        factors[key] = factor
+        for v in factor.variables:
+            mentions[v].add(key)
+    return list(factors.values())
+
+
+def gene_marginal(factors, person, order=None):
+    """
+    Returns the normalized distribution of `person`'s genes, eliminating
+    everyone else in `order` (by default a min-fill order).
+    """
+    if order is None:
+        order = min_fill_order(factors, keep=[person])
+    left = eliminate(factors, [v for v in order if v != person])
+    result = np.ones(3)
+    for factor in left:
+        result = result * factor.table
+        if result.max() == 0:
+            raise ValueError("evidence is impossible")
+        result = result / result.max()
+    return result / result.sum()
+
+
+def marginals(people, probs=PROBS):
+    """
+    Returns the probability of every number of copies of the gene and of
+    having the trait, for every person, in the format of heredity.main.
+
+    Each person's gene distribution is found by variable elimination
+    rather than by summing over every world, which takes time polynomial
+    in the number of people when the family tree has few loops. An
+    unknown trait depends only on the person's genes, so its
+    distribution follows from theirs.
+
+    One min-fill order is found for the whole family and reused for
+    every person, leaving that person out.
+    """
+    _, _, trait = gene_tables(probs)
+    factors = family_factors(people, probs)
+    order = min_fill_order(factors)
+    probabilities = dict()
+    for name, person in people.items():
+        genes = gene_marginal(factors, name, order)
+        if person["trait"] is None:
+            has_trait = float(genes @ trait[:, 1])
+        else:
+            has_trait = float(person["trait"])
+        probabilities[name] = {
+            "gene": {2: float(genes[2]), 1: float(genes[1]),
+                     0: float(genes[0])},
+            "trait": {True: has_trait, False: 1 - has_trait}
+        }
+    return probabilities
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python elimination.py data.csv")
+    people = load_data(sys.argv[1])
+    print_probabilities(marginals(people))
+
+
+if __name__ == "__main__":
+    main()
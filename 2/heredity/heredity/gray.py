@@ -0,0 +1,137 @@
+import sys
+
+from heredity import (PROBS, inheritance_table, load_data,
+                      print_probabilities)
+from sampling import topological_order
+
+
+def marginals(people, probs=PROBS):
+    """
+    Returns the probability of every number of copies of the gene and of
+    having the trait, for every person, in the format of heredity.main,
+    by enumerating every assignment of genes exactly.
+
+    Assignments are visited in reflected Gray code order, so each one
+    differs from the last in one person's genes, and only the factors of
+    that person and of their children are recomputed. People are ordered
+    children first, so that their factors only depend on themselves and
+    on people further along, and the joint probability is kept as the
+    suffix products of the factors in that order: a change to person i
+    only redoes the products up to i, with no division to drift.
+
+    Known traits are not enumerated but multiplied in as evidence, and
+    gene counts that make a known trait impossible are left out of the
+    person's digit before starting. Unknown traits sum out to 1, so
+    their distribution follows from the person's genes at the end.
+
+    Each world's probability is added to a running total per digit that
+    is credited to the digit's current value whenever it or a higher
+    digit changes, so keeping the marginals also takes constant time
+    per world on average.
+    """
+    gene = [probs["gene"][g] for g in range(3)]
+    inheritance = inheritance_table(probs)
+    trait = [[probs["trait"][g][False], probs["trait"][g][True]]
+             for g in range(3)]
+
+    # Children before parents
+    names = topological_order(people)[::-1]
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+    mother = [None] * n
+    father = [None] * n
+    children = [[] for _ in range(n)]
+    evidence = [None] * n
+    domains = []
+    for i, name in enumerate(names):
+        person = people[name]
+        if person["mother"] is not None and person["father"] is not None:
+            mother[i] = index[person["mother"]]
+            father[i] = index[person["father"]]
+            children[mother[i]].append(i)
+            children[father[i]].append(i)
+        if person["trait"] is not None:
+            evidence[i] = int(person["trait"])
+        domains.append([g for g in range(3)
+                        if evidence[i] is None or trait[g][evidence[i]] > 0])
+        if not domains[i]:
+            raise ValueError(f"{name}'s trait is impossible")
+
+    genes = [domain[0] for domain in domains]
+
+    def factor(i):
+        g = genes[i]
+        if mother[i] is None:
+            p = gene[g]
+        else:
+            p = inheritance[genes[mother[i]]][genes[father[i]]][g]
+        if evidence[i] is not None:
+            p *= trait[g][evidence[i]]
+        return p
+
+    values = [factor(i) for i in range(n)]
+    suffix = [1.0] * (n + 1)
+    for i in reversed(range(n)):
+        suffix[i] = values[i] * suffix[i + 1]
+
+    # Gray code digits: the people with a choice of genes, lowest first
+    digits = [i for i in range(n) if len(domains[i]) > 1]
+    m = len(digits)
+    position = [0] * m
+    direction = [1] * m
+
+    # Probability of the worlds since each digit's total was last credited
+    pending = [0.0] * (m + 1)
+    totals = [[0.0] * 3 for _ in range(n)]
+    while True:
+        pending[0] += suffix[0]
+
+        # Lowest digit that can still move in its direction
+        k = 0
+        while k < m and not \
+                0 <= position[k] + direction[k] < len(domains[digits[k]]):
+            direction[k] = -direction[k]
+            k += 1
+        for j in range(min(k + 1, m)):
+            totals[digits[j]][genes[digits[j]]] += pending[j]
+            pending[j + 1] += pending[j]
+            pending[j] = 0.0
+        if k == m:
+            break
+
+        position[k] += direction[k]
+        i = digits[k]
+        genes[i] = domains[i][position[k]]
+        values[i] = factor(i)
+        for child in children[i]:
+            values[child] = factor(child)
+        for j in range(i, -1, -1):
+            suffix[j] = values[j] * suffix[j + 1]
+
+    total = pending[m]
+    probabilities = dict()
+    for i, name in enumerate(names):
+        if len(domains[i]) == 1:
+            totals[i][genes[i]] = total
+        distribution = [t / total for t in totals[i]]
+        if evidence[i] is None:
+            has_trait = sum(distribution[g] * trait[g][1] for g in range(3))
+        else:
+            has_trait = float(evidence[i])
+        probabilities[name] = {
+            "gene": {2: distribution[2], 1: distribution[1],
+                     0: distribution[0]},
+            "trait": {True: has_trait, False: 1 - has_trait}
+        }
+    return {name: probabilities[name] for name in people}
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python gray.py data.csv")
+    people = load_data(sys.argv[1])
+    print_probabilities(marginals(people))
+
+
+if __name__ == "__main__":
+    main()
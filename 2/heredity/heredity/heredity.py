@@ -85,7 +85,14 @@ def main():
     normalize(probabilities)
 
     # Print results
-    for person in people:
+    print_probabilities(probabilities)
+
+
+def print_probabilities(probabilities):
+    """
+    Print the gene and trait distribution of every person.
+    """
+    for person in probabilities:
         print(f"{person}:")
         for field in probabilities[person]:
             print(f"  {field.capitalize()}:")
@@ -128,6 +135,38 @@ def powerset(s):
     ]
 
 
+def inheritance_table(probs):
+    """
+    Return the probability that a child has each number of copies of the
+    gene given the numbers of copies of its mother and father, as a
+    nested list indexed [mother][father][child].
+
+    A parent with 2 copies passes the gene on unless it mutates, one with
+    no copies only if it mutates, and one with 1 copy half of the time.
+    """
+    mutation = probs["mutation"]
+    passes = [mutation, 0.5, 1 - mutation]
+    table = []
+    for mother in range(3):
+        row = []
+        for father in range(3):
+            m, f = passes[mother], passes[father]
+            row.append([(1 - m) * (1 - f),
+                        m * (1 - f) + (1 - m) * f,
+                        m * f])
+        table.append(row)
+    return table
+
+
+# Tables built once from PROBS: gene probabilities of people without
+# parents and of children by their parents' genes, indexed by number of
+# copies, and trait probabilities indexed [genes][has trait]
+GENE = [PROBS["gene"][gene] for gene in range(3)]
+INHERITANCE = inheritance_table(PROBS)
+TRAIT = [[PROBS["trait"][gene][False], PROBS["trait"][gene][True]]
+         for gene in range(3)]
+
+
 def joint_probability(people, one_gene, two_genes, have_trait):
     """
     Compute and return a joint probability.
@@ -138,113 +177,26 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone not in `one_gene` or `two_gene` does not have the gene, and
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
+
+    Each person contributes the probability of their genes, from GENE
+    or from INHERITANCE given their parents' genes, times the
+    probability of their trait given their genes, from TRAIT.
     """
-    jp = 1
-    namesPeople = set(people.keys())
-    zero_genes = namesPeople.difference(one_gene).difference(two_genes)
-    not_have_trait = namesPeople.difference(have_trait)
+    genes = dict.fromkeys(people, 0)
+    for person in one_gene:
+        genes[person] = 1
+    for person in two_genes:
+        genes[person] = 2
 
-    def formWorld(namesPeople,zero_genes, one_gene, two_genes, have_trait, not_have_trait):
-        pw  =   { 
-                    person:
-                        {
-                            "gene"  :   None,
-                            "trait" :   None 
-                        }
-                for person in namesPeople
-        }
-        # target genes
-        for x in one_gene:
-            pw[x]["gene"] = 1
-        for x in two_genes:
-            pw[x]["gene"] = 2
-        for x in zero_genes:
-            pw[x]["gene"] = 0
-        # target traits
-        for x in have_trait:
-            pw[x]["trait"] = True
-        for x in not_have_trait:
-            pw[x]["trait"] = False
-        
-        return pw
-    
-    world = formWorld(namesPeople, zero_genes, one_gene, two_genes, have_trait, not_have_trait)
-
-    def anyParents(person):
-        if people[person]['mother'] != None and people[person]['father'] != None:
-            return True
-        else:
-            return False
-
-    # functions and constants for conditional case
-    def genePairs(gene):
-                if gene == 0:
-                    return [0, 0]
-                elif gene == 1:
-                    return [0, 1]
-                elif gene == 2:
-                    return [1, 1]
-                else:
-                    raise ValueError('invalid gene value')
-                
-    def inheritGenes(motherPair, fatherPair):
-        return list(itertools.product(motherPair, fatherPair))
-    # list e almayi unutmustum bug burdaydi
-    tableTF = list(itertools.product([True, False], [True, False]))
-
-    def allPairs(inhGenes, tableTF):
-        return list(itertools.product(inhGenes, tableTF))
-    
-    def mutatePairs(pairList):
-        mutList = []
-        for pair in pairList:
-            p = 0.25 # likelihood of this inheritance / there are 4 inheritance totally
-            g1 = pair[0][0]
-            g2 = pair[0][1]
-            # any mutation for gene 1
-            if pair[1][0]:
-                p *= PROBS['mutation']
-                g1 = -g1 + 1
-            else:
-                p *= 1-PROBS['mutation']
-            # any mutation for gene 2
-            if pair[1][1]:
-                p *= PROBS['mutation']
-                g2 = -g2 + 1
-            else:
-                p *= 1-PROBS['mutation']
-            # stored varible newGenes if mutated and probability of this gene pair's likelihood
-            tmp = ((g1, g2), p)
-            mutList.append(tmp)
-        return mutList
-
-    for person in namesPeople:
-        # target values: gene and trait
-        gene = world[person]['gene']
-        trait = world[person]['trait']
-
-        if anyParents(person):
-            motherName = people[person]['mother']
-            fatherName = people[person]['father']
-            motherGeneCount = world[motherName]['gene']
-            fatherGeneCount = world[fatherName]['gene']
-            motherGenePair = genePairs(motherGeneCount)
-            fatherGenePair = genePairs(fatherGeneCount)
-            # due to inheritance
-            crossedGenes = inheritGenes(motherGenePair, fatherGenePair)
-            # consider any mutation
-            rawGenePairPool = allPairs(crossedGenes, tableTF)
-            # after if any mutation
-            wholeGenePairPool = mutatePairs(rawGenePairPool)
-            # check for the target gene count and sum the complying ones'
-            childGeneProb = 0
-            for p in wholeGenePairPool:
-                if p[0][0]+p[0][1] == gene:
-                    childGeneProb += p[1]
-            jp *= childGeneProb*PROBS['trait'][gene][trait]
+    jp = 1
+    for person, data in people.items():
+        gene = genes[person]
+        mother, father = data["mother"], data["father"]
+        if mother is not None and father is not None:
+            jp *= INHERITANCE[genes[mother]][genes[father]][gene]
         else:
-            jp *= PROBS['gene'][gene]*PROBS['trait'][gene][trait]
-
+            jp *= GENE[gene]
+        jp *= TRAIT[gene][person in have_trait]
     return jp
 
 
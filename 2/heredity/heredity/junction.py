@@ -0,0 +1,293 @@
+import sys
+
+import numpy as np
+
+from elimination import Factor, gene_tables, min_fill_order, multiply
+from heredity import PROBS, load_data, print_probabilities
+
+
+class JunctionTree():
+    """
+    A family compiled once into a tree of cliques of people, for exact
+    gene and trait marginals that can be updated cheaply as traits are
+    observed or retracted.
+
+    Every clique holds the product of the inheritance and prior factors
+    assigned to it, and every person's trait evidence is multiplied into
+    one clique containing them, their home. Marginals come from messages
+    passed along the tree; messages are computed only when a query needs
+    them and are kept until evidence changes on their sending side, so a
+    change of one person's trait only recomputes the messages leading
+    away from that person's home.
+    """
+
+    def __init__(self, people, probs=PROBS):
+        self.people = people
+        self.prior, self.inheritance, self.trait = gene_tables(probs)
+        factors = []
+        for name, person in people.items():
+            if person["mother"] is None:
+                factors.append(Factor([name], self.prior))
+            else:
+                factors.append(Factor(
+                    [person["mother"], person["father"], name],
+                    self.inheritance))
+
+        self.cliques = triangulate(factors)
+        self.neighbours, self.separators = spanning_tree(self.cliques)
+
+        # Clique containing each person, and factors assigned to each clique
+        containing = dict()
+        for c, clique in enumerate(self.cliques):
+            for name in clique:
+                containing.setdefault(name, []).append(c)
+        self.home = {name: containing[name][0] for name in people}
+        assigned = [[] for _ in self.cliques]
+        for factor in factors:
+            c = next(c for c in containing[factor.variables[-1]]
+                     if set(factor.variables) <= set(self.cliques[c]))
+            assigned[c].append(factor)
+        self.base = [product(clique, assigned[c])
+                     for c, clique in enumerate(self.cliques)]
+        self.residents = [[] for _ in self.cliques]
+        for name in people:
+            self.residents[self.home[name]].append(name)
+
+        self.evidence = {name: person["trait"]
+                         for name, person in people.items()}
+        self.potentials = dict()
+        self.messages = dict()
+
+    def set_evidence(self, name, trait):
+        """
+        Sets whether `name` has the trait (None if unknown), discarding
+        only the messages that depend on it.
+        """
+        if self.evidence[name] == trait:
+            return
+        self.evidence[name] = trait
+        home = self.home[name]
+        self.potentials.pop(home, None)
+
+        # Messages sent away from the home clique change
+        stack = [home]
+        seen = {home}
+        while stack:
+            c = stack.pop()
+            for d in self.neighbours[c]:
+                if d not in seen:
+                    seen.add(d)
+                    self.messages.pop((c, d), None)
+                    stack.append(d)
+
+    def retract(self, name):
+        """Forgets whether `name` has the trait."""
+        self.set_evidence(name, None)
+
+    def potential(self, c):
+        """
+        Returns the table of clique `c`: its assigned factors times the
+        trait evidence of the people whose home it is.
+        """
+        if c not in self.potentials:
+            factors = [self.base[c]]
+            for name in self.residents[c]:
+                if self.evidence[name] is not None:
+                    factors.append(Factor(
+                        [name], self.trait[:, int(self.evidence[name])]))
+            self.potentials[c] = product(self.cliques[c], factors)
+        return self.potentials[c]
+
+    def message(self, c, d):
+        """
+        Returns the message from clique `c` to its neighbour `d`, first
+        computing any messages it depends on that are not kept.
+        """
+        stack = [(c, d)]
+        while stack:
+            a, b = stack[-1]
+            if (a, b) in self.messages:
+                stack.pop()
+                continue
+            missing = [(e, a) for e in self.neighbours[a]
+                       if e != b and (e, a) not in self.messages]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            factors = [self.potential(a)] + [
+                self.messages[(e, a)] for e in self.neighbours[a] if e != b]
+            table = product(self.separators[(a, b)], factors).table
+            total = table.sum()
+            if total > 0:
+                table = table / total
+            self.messages[(a, b)] = Factor(self.separators[(a, b)], table)
+        return self.messages[(c, d)]
+
+    def belief(self, c):
+        """
+        Returns the normalized distribution of the genes of the people in
+        clique `c` given the evidence, as a table over the clique.
+        """
+        factors = [self.potential(c)] + [
+            self.message(e, c) for e in self.neighbours[c]]
+        table = product(self.cliques[c], factors).table
+        total = table.sum()
+        if total == 0:
+            raise ValueError("evidence is impossible")
+        return table / total
+
+    def gene_marginal(self, name, belief=None):
+        """
+        Returns the distribution of `name`'s genes given the evidence,
+        summed out of `belief`, their home clique's belief, if given.
+        """
+        c = self.home[name]
+        if belief is None:
+            belief = self.belief(c)
+        axis = self.cliques[c].index(name)
+        others = tuple(i for i in range(belief.ndim) if i != axis)
+        return belief.sum(axis=others)
+
+    def marginals(self):
+        """
+        Returns the probability of every number of copies of the gene and
+        of having the trait, for every person, in the format of
+        heredity.main, given the current evidence.
+        """
+        genes = dict()
+        for c, residents in enumerate(self.residents):
+            if residents:
+                belief = self.belief(c)
+                for name in residents:
+                    genes[name] = self.gene_marginal(name, belief)
+
+        probabilities = dict()
+        for name in self.people:
+            if self.evidence[name] is None:
+                has_trait = float(genes[name] @ self.trait[:, 1])
+            else:
+                has_trait = float(self.evidence[name])
+            probabilities[name] = {
+                "gene": {2: float(genes[name][2]), 1: float(genes[name][1]),
+                         0: float(genes[name][0])},
+                "trait": {True: has_trait, False: 1 - has_trait}
+            }
+        return probabilities
+
+
+def product(variables, factors):
+    """
+    Returns the product of `factors` with every variable not in
+    `variables` summed out, as a factor over `variables` in that order.
+    Factors are multiplied two at a time, as einsum takes a limited
+    number of operands.
+    """
+    result = Factor(variables, np.ones((3,) * len(variables)))
+    for factor in factors:
+        result = multiply(result, factor)
+    others = tuple(range(len(variables), len(result.variables)))
+    return Factor(variables, result.table.sum(axis=others))
+
+
+def triangulate(factors):
+    """
+    Returns the maximal cliques of the graph joining the variables of
+    every factor (which marries each child's parents, closing the loops
+    of consanguineous families), once triangulated by eliminating the
+    variables in min-fill order. Cliques are tuples of sorted names.
+    """
+    neighbours = dict()
+    for factor in factors:
+        for v in factor.variables:
+            neighbours.setdefault(v, set()).update(factor.variables)
+    for v in neighbours:
+        neighbours[v].discard(v)
+
+    # Each elimination makes a clique of the variable and its neighbours;
+    # a clique is only kept if no earlier one, which must then contain
+    # the variable just eliminated, contains it
+    cliques = []
+    containing = dict()
+    for v in min_fill_order(factors):
+        near = neighbours.pop(v)
+        for a in near:
+            neighbours[a].discard(v)
+            neighbours[a].update(near - {a})
+        clique = near | {v}
+        if any(clique <= cliques[c] for c in containing.get(v, [])):
+            continue
+        for a in clique:
+            containing.setdefault(a, []).append(len(cliques))
+        cliques.append(clique)
+    return [tuple(sorted(clique)) for clique in cliques]
+
+
+def spanning_tree(cliques):
+    """
+    Joins `cliques` into a junction tree: a maximum spanning tree by the
+    number of people two cliques share, with any separate families
+    joined one after another by empty separators. Returns each clique's neighbours and
+    the people shared along each edge, in both directions.
+    """
+    containing = dict()
+    for c, clique in enumerate(cliques):
+        for v in clique:
+            containing.setdefault(v, []).append(c)
+    edges = set()
+    for members in containing.values():
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                edges.add((a, b))
+    edges = sorted(edges, key=lambda edge: -len(
+        set(cliques[edge[0]]) & set(cliques[edge[1]])))
+    edges += [(c - 1, c) for c in range(1, len(cliques))]
+
+    # Kruskal's algorithm with a union-find forest
+    parent = list(range(len(cliques)))
+
+    def root(c):
+        while parent[c] != c:
+            parent[c] = parent[parent[c]]
+            c = parent[c]
+        return c
+
+    neighbours = [[] for _ in cliques]
+    separators = dict()
+    for a, b in edges:
+        if root(a) == root(b):
+            continue
+        parent[root(a)] = root(b)
+        neighbours[a].append(b)
+        neighbours[b].append(a)
+        shared = tuple(v for v in cliques[a] if v in cliques[b])
+        separators[(a, b)] = separators[(b, a)] = shared
+    return neighbours, separators
+
+
+def marginals(people, probs=PROBS):
+    """
+    Returns the probability of every number of copies of the gene and of
+    having the trait, for every person, in the format of heredity.main,
+    from a junction tree compiled for this one query.
+    """
+    return JunctionTree(people, probs).marginals()
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python junction.py data.csv [name=0|1|? ...]")
+    people = load_data(sys.argv[1])
+    tree = JunctionTree(people)
+    print_probabilities(tree.marginals())
+    for change in sys.argv[2:]:
+        name, _, value = change.partition("=")
+        if name not in people or value not in ("0", "1", "?"):
+            sys.exit(f"Invalid evidence {change}")
+        tree.set_evidence(name, None if value == "?" else value == "1")
+        print(f"\nWith {name}={value}:")
+        print_probabilities(tree.marginals())
+
+
+if __name__ == "__main__":
+    main()
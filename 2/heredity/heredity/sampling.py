@@ -0,0 +1,361 @@
+import random
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from elimination import gene_tables
+from heredity import PROBS, load_data
+
+METHODS = ["gibbs", "weighting"]
+
+# Sweeps of Gibbs sampling per chain, after discarding BURN_IN sweeps
+SWEEPS = 2000
+BURN_IN = 200
+
+# Samples of likelihood weighting per chain, drawn CHUNK at a time
+SAMPLES = 100000
+CHUNK = 1024
+
+CHAINS = 4
+
+
+class Model():
+    """
+    The heredity network of a family, in a form cheap to sample from:
+    people in an order where parents come before their children, each
+    with the indices of their parents (-1 for none), their known trait
+    (None if unknown) and, for each of their children, the child's index,
+    the other parent's index and whether this person is the mother.
+    """
+
+    def __init__(self, people, probs=PROBS):
+        self.names = topological_order(people)
+        index = {name: i for i, name in enumerate(self.names)}
+        self.n = len(self.names)
+        self.mother = [-1] * self.n
+        self.father = [-1] * self.n
+        self.trait = [people[name]["trait"] for name in self.names]
+        self.children = [[] for _ in range(self.n)]
+        for i, name in enumerate(self.names):
+            mother, father = people[name]["mother"], people[name]["father"]
+            if mother is not None and father is not None:
+                m, f = index[mother], index[father]
+                self.mother[i] = m
+                self.father[i] = f
+                self.children[m].append((i, f, True))
+                self.children[f].append((i, m, False))
+
+        prior, inheritance, trait = gene_tables(probs)
+        self.prior = prior
+        self.inheritance = inheritance
+        self.trait_table = trait
+
+    def features(self, genes):
+        """
+        Returns, for gene counts `genes` (any shape), the values whose
+        averages are the marginals: indicators of 0, 1 and 2 copies, and
+        the probability of having the trait.
+        """
+        genes = np.asarray(genes)
+        return np.stack([genes == 0, genes == 1, genes == 2,
+                         self.trait_table[genes, 1]], axis=-1).astype(float)
+
+
+def topological_order(people):
+    """
+    Returns the names of `people` ordered so that parents come before
+    their children. Raises ValueError if someone is their own ancestor.
+    """
+    order = []
+    state = dict()
+    for start in people:
+        stack = [(start, False)]
+        while stack:
+            name, done = stack.pop()
+            if done:
+                state[name] = "done"
+                order.append(name)
+                continue
+            if state.get(name) == "done":
+                continue
+            if state.get(name) == "open":
+                raise ValueError(f"{name} is their own ancestor")
+            state[name] = "open"
+            stack.append((name, True))
+            for parent in (people[name]["mother"], people[name]["father"]):
+                if parent is not None and state.get(parent) != "done":
+                    stack.append((parent, False))
+    return order
+
+
+def gibbs_chain(model, sweeps, burn_in, seed):
+    """
+    Runs one chain of Gibbs sampling over everyone's genes and returns
+    its trace: for every sweep after `burn_in`, every person's features
+    averaged over the conditional distribution of their genes given
+    everyone else's (a Rao-Blackwellized estimate, with less variance
+    than the sampled genes themselves), as a (sweeps, people, 4) array.
+    """
+    rng = random.Random(int(np.random.default_rng(seed).integers(2 ** 63)))
+    prior = model.prior.tolist()
+    inheritance = model.inheritance.tolist()
+    trait = model.trait_table.tolist()
+    features = model.features(np.arange(3))
+
+    # Start from a sample of the genes ignoring the traits
+    genes = [0] * model.n
+    for i in range(model.n):
+        row = (prior if model.mother[i] < 0 else
+               inheritance[genes[model.mother[i]]][genes[model.father[i]]])
+        genes[i] = rng.choices(range(3), row)[0]
+
+    trace = np.empty((sweeps, model.n, 4))
+    conditional = np.empty((model.n, 3))
+    for sweep in range(burn_in + sweeps):
+        for i in range(model.n):
+            m, f = model.mother[i], model.father[i]
+            weights = list(prior if m < 0 else
+                           inheritance[genes[m]][genes[f]])
+            if model.trait[i] is not None:
+                for g in range(3):
+                    weights[g] *= trait[g][model.trait[i]]
+            for child, other, is_mother in model.children[i]:
+                c, o = genes[child], genes[other]
+                for g in range(3):
+                    weights[g] *= (inheritance[g][o][c] if is_mother
+                                   else inheritance[o][g][c])
+            total = weights[0] + weights[1] + weights[2]
+            u = rng.random() * total
+            genes[i] = 0 if u < weights[0] else \
+                1 if u < weights[0] + weights[1] else 2
+            conditional[i] = weights
+            conditional[i] /= total
+        if sweep >= burn_in:
+            trace[sweep - burn_in] = conditional @ features
+    return trace
+
+
+def weighting_chain(model, samples, seed):
+    """
+    Runs likelihood weighting: samples everyone's genes forward from
+    the parents, and weighs each sample by the probability of the known
+    traits. Samples are drawn `CHUNK` at a time.
+
+    Returns the sums needed to combine chains, relative to the largest
+    log weight: that log weight, the sum of the weights, the sum of
+    their squares, and, per person and feature f, the sums of w f,
+    w^2 f and w^2 f^2.
+    """
+    rng = np.random.default_rng(seed)
+    with np.errstate(divide="ignore"):
+        log_trait = np.log(model.trait_table)
+    sums = []
+    for start in range(0, samples, CHUNK):
+        size = min(CHUNK, samples - start)
+        genes = np.empty((model.n, size), dtype=np.intp)
+        log_w = np.zeros(size)
+        for i in range(model.n):
+            if model.mother[i] < 0:
+                rows = np.broadcast_to(model.prior, (size, 3))
+            else:
+                rows = model.inheritance[genes[model.mother[i]],
+                                         genes[model.father[i]]]
+            u = rng.random(size)[:, None]
+            genes[i] = (u >= np.cumsum(rows, axis=1)[:, :2]).sum(axis=1)
+            if model.trait[i] is not None:
+                log_w += log_trait[genes[i], int(model.trait[i])]
+
+        shift = log_w.max()
+        w = np.exp(log_w - shift)
+        values = model.features(genes)
+        sums.append((shift, w.sum(), (w ** 2).sum(),
+                     np.einsum("s,psk->pk", w, values),
+                     np.einsum("s,psk->pk", w ** 2, values),
+                     np.einsum("s,psk->pk", w ** 2, values ** 2)))
+    return combine(sums)
+
+
+def combine(sums):
+    """
+    Combines the sums of several runs of likelihood weighting, each
+    relative to its own largest log weight, as returned by
+    `weighting_chain`.
+    """
+    shift = max(part[0] for part in sums)
+    total = [0] * 5
+    for part in sums:
+        scale = np.exp(part[0] - shift)
+        for k, value in enumerate(part[1:]):
+            total[k] = total[k] + scale ** (1 if k in (0, 2) else 2) * value
+    return (shift, *total)
+
+
+def split_rhat(traces):
+    """
+    Returns the split R-hat of (chains, draws, ...) traces: each chain
+    is cut in two halves, and the variance between the halves' means is
+    compared with the variance within them. Values near 1 mean the
+    chains agree; constant traces get exactly 1.
+    """
+    half = traces.shape[1] // 2
+    halves = np.concatenate([traces[:, :half], traces[:, half:2 * half]])
+    within = halves.var(axis=1, ddof=1).mean(axis=0)
+    between = half * halves.mean(axis=1).var(axis=0, ddof=1)
+    pooled = (half - 1) / half * within + between / half
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rhat = np.sqrt(pooled / within)
+    return np.where(within > 0, rhat, 1.0)
+
+
+def effective_size(traces):
+    """
+    Returns the effective sample size of (chains, draws, ...) traces,
+    from the autocorrelation averaged over chains, summed in pairs of
+    lags while the pairs stay positive (Geyer's initial positive
+    sequence). Constant traces count every draw.
+    """
+    chains, draws = traces.shape[:2]
+    centered = traces - traces.mean(axis=1, keepdims=True)
+    size = 1 << (2 * draws - 1).bit_length()
+    spectrum = np.fft.rfft(centered, n=size, axis=1)
+    autocovariance = np.fft.irfft(spectrum * np.conj(spectrum), n=size,
+                                  axis=1)[:, :draws] / draws
+    within = autocovariance[:, 0].mean(axis=0)
+    between = traces.mean(axis=1).var(axis=0, ddof=1) if chains > 1 else 0
+    pooled = (draws - 1) / draws * within + between
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rho = 1 - (within - autocovariance.mean(axis=0)) / pooled
+    rho = np.nan_to_num(rho, nan=0.0)
+
+    # Sum pairs of lags while positive
+    pairs = rho[:-1:2] + rho[1::2]
+    positive = np.cumprod(pairs > 0, axis=0)
+    tau = -1 + 2 * (pairs * positive).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ess = chains * draws / np.maximum(tau, 1 / np.log10(chains * draws))
+    return np.where(pooled > 0, ess, chains * draws)
+
+
+def run_chains(function, args, chains, seed):
+    """
+    Runs `chains` calls function(*args, seed) in a process pool, each
+    with an independent stream spawned from one SeedSequence, and
+    returns their results in chain order.
+    """
+    streams = np.random.SeedSequence(seed).spawn(chains)
+    if chains == 1:
+        return [function(*args, streams[0])]
+    with ProcessPoolExecutor(max_workers=chains) as executor:
+        futures = [executor.submit(function, *args, stream)
+                   for stream in streams]
+        return [future.result() for future in futures]
+
+
+def gibbs(people, sweeps=SWEEPS, burn_in=BURN_IN, chains=CHAINS, seed=None,
+          probs=PROBS):
+    """
+    Estimates everyone's gene and trait distributions by Gibbs sampling
+    in `chains` independent chains, run in parallel processes.
+
+    Returns the estimates, their standard errors and, per person, the
+    largest R-hat and smallest effective sample size over the features.
+    """
+    model = Model(people, probs)
+    traces = np.stack(run_chains(gibbs_chain, (model, sweeps, burn_in),
+                                 chains, seed))
+    estimate = traces.mean(axis=(0, 1))
+    ess = effective_size(traces)
+    error = traces.std(axis=(0, 1), ddof=1) / np.sqrt(ess)
+    rhat = split_rhat(traces) if chains * sweeps >= 4 else np.ones_like(ess)
+    return summarize(model, estimate, error, rhat, ess)
+
+
+def weighting(people, samples=SAMPLES, chains=CHAINS, seed=None,
+              probs=PROBS):
+    """
+    Estimates everyone's gene and trait distributions by likelihood
+    weighting, with `samples` samples in each of `chains` parallel
+    processes.
+
+    Returns the estimates, their standard errors, and, per person, no
+    R-hat (the samples are independent) and the Kish effective sample
+    size of the weights. The standard error is the larger of the one
+    from the variance of the self-normalized estimator, which is too
+    small when a few weights dominate, and the one from the spread of
+    the chains' separate estimates. With many known traits a few
+    samples carry nearly all the weight, which the effective sample size
+    shows; Gibbs sampling is the better choice then.
+    """
+    model = Model(people, probs)
+    results = run_chains(weighting_chain, (model, samples), chains, seed)
+    _, w, w2, wf, w2f, w2f2 = combine(results)
+    estimate = wf / w
+    variance = (w2f2 - 2 * estimate * w2f + estimate ** 2 * w2) / w ** 2
+    error = np.sqrt(np.maximum(variance, 0))
+    if chains > 1:
+        separate = np.stack([result[3] / result[1] for result in results])
+        error = np.maximum(error, separate.std(axis=0, ddof=1)
+                           / np.sqrt(chains))
+    ess = np.full(estimate.shape, w ** 2 / w2)
+    return summarize(model, estimate, error, None, ess)
+
+
+def summarize(model, estimate, error, rhat, ess):
+    """
+    Turns per-person feature arrays into dictionaries keyed by name, in
+    the format of heredity.main, plus matching standard errors and
+    per-person diagnostics. Known traits are exact.
+    """
+    probabilities = dict()
+    errors = dict()
+    diagnostics = dict()
+    for i, name in enumerate(model.names):
+        p, e = estimate[i].tolist(), error[i].tolist()
+        if model.trait[i] is not None:
+            p[3], e[3] = float(model.trait[i]), 0.0
+        probabilities[name] = {
+            "gene": {2: p[2], 1: p[1], 0: p[0]},
+            "trait": {True: p[3], False: 1 - p[3]}
+        }
+        errors[name] = {
+            "gene": {2: e[2], 1: e[1], 0: e[0]},
+            "trait": {True: e[3], False: e[3]}
+        }
+        diagnostics[name] = {
+            "rhat": None if rhat is None else float(rhat[i].max()),
+            "ess": float(ess[i].min())
+        }
+    return probabilities, errors, diagnostics
+
+
+def print_estimates(probabilities, errors, diagnostics):
+    """
+    Print every person's estimated distributions with error bars (one
+    standard error) and their sampling diagnostics.
+    """
+    for person in probabilities:
+        rhat = diagnostics[person]["rhat"]
+        rhat = "-" if rhat is None else f"{rhat:.3f}"
+        print(f"{person}: (R-hat {rhat}, "
+              f"ESS {diagnostics[person]['ess']:.0f})")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                e = errors[person][field][value]
+                print(f"    {value}: {p:.4f} ± {e:.4f}")
+
+
+def main():
+    method = sys.argv[2] if len(sys.argv) == 3 else "gibbs"
+    if len(sys.argv) not in (2, 3) or method not in METHODS:
+        sys.exit(f"Usage: python sampling.py data.csv [{'|'.join(METHODS)}]")
+    people = load_data(sys.argv[1])
+    estimate = gibbs if method == "gibbs" else weighting
+    print_estimates(*estimate(people))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import math
+
+import elimination
+
+
+def person(name, mother=None, father=None, trait=None):
+    return {"name": name, "mother": mother, "father": father, "trait": trait}
+
+
+def test_many_affected_founders_give_finite_marginals():
+    people = {f"F{i}": person(f"F{i}", trait=True) for i in range(300)}
+    probabilities = elimination.marginals(people)
+    for name in people:
+        genes = probabilities[name]["gene"]
+        assert all(math.isfinite(p) for p in genes.values())
+        assert math.isclose(sum(genes.values()), 1)
+        assert math.isclose(genes[1], 0.5106382978723405)
+
+
+def test_many_children_of_one_couple():
+    people = {"Mother": person("Mother"), "Father": person("Father")}
+    for i in range(70):
+        name = f"Child{i}"
+        people[name] = person(name, "Mother", "Father", trait=i % 2 == 0)
+    probabilities = elimination.marginals(people)
+    assert math.isclose(sum(probabilities["Mother"]["gene"].values()), 1)
@@ -0,0 +1,105 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+import crawler
+from generate import preferential_attachment, write_corpus
+from pagerank import DAMPING, iterate_pagerank, sample_pagerank
+from sparse import Graph, SOLVERS, solve
+
+SIZES = [100, 1000, 10000]
+LINKS = 3
+SEED = 0
+
+# Samples drawn per page by the samplers
+SAMPLES_PER_PAGE = 100
+
+# Walkers advanced together by the vectorized sampler
+WALKERS = 10000
+
+# Processes used by the parallel sampler
+WORKERS = os.cpu_count() or 1
+
+# Tolerance of the reference solution
+REFERENCE_TOLERANCE = 1e-12
+
+
+def l1_error(ranks, reference):
+    """Returns the L1 distance between two rank dictionaries."""
+    return sum(abs(ranks[page] - reference[page]) for page in reference)
+
+
+def timed(function, *args, **kwargs):
+    """Returns the result of a call and the seconds it took."""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def benchmark(sizes, links=LINKS, seed=SEED):
+    """
+    Generates a preferential attachment corpus for each number of pages
+    in `sizes`, writes it out as HTML and times crawling it (with and
+    without the link cache), every iterative solver and both samplers.
+
+    Returns a list of result records, one per (size, task) pair, with
+    the L1 error of the ranks against a tightly converged reference.
+    """
+    results = []
+    for n in sizes:
+        corpus = preferential_attachment(n, links, seed)
+        with tempfile.TemporaryDirectory() as directory:
+            write_corpus(corpus, directory)
+            cache = os.path.join(directory, crawler.CACHE)
+            crawled, cold = timed(crawler.crawl, directory, cache=cache)
+            _, warm = timed(crawler.crawl, directory, cache=cache)
+        if crawled != corpus:
+            raise Exception(f"crawl did not recover corpus of {n} pages")
+
+        graph = Graph.from_corpus(corpus)
+        reference = graph.to_dict(
+            solve(graph, DAMPING, REFERENCE_TOLERANCE)[0])
+        record = {"pages": n,
+                  "links": sum(len(links) for links in corpus.values())}
+        results.append(dict(record, task="crawl", seconds=cold))
+        results.append(dict(record, task="crawl_cached", seconds=warm))
+
+        for method in SOLVERS:
+            ranks, seconds = timed(iterate_pagerank, corpus, DAMPING,
+                                   method=method)
+            results.append(dict(record, task=f"iterate_{method}",
+                                seconds=seconds,
+                                l1_error=l1_error(ranks, reference)))
+
+        samples = SAMPLES_PER_PAGE * n
+        samplers = [("sample", None, None), ("sample_walkers", WALKERS, None),
+                    ("sample_parallel", WALKERS, WORKERS)]
+        for task, walkers, workers in samplers:
+            ranks, seconds = timed(sample_pagerank, corpus, DAMPING,
+                                   samples, walkers=walkers,
+                                   workers=workers, seed=seed)
+            results.append(dict(record, task=task, samples=samples,
+                                seconds=seconds,
+                                l1_error=l1_error(ranks, reference)))
+    return results
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python benchmark.py [max_pages] [output.json]")
+    sizes = SIZES
+    if len(sys.argv) >= 2:
+        largest = int(sys.argv[1])
+        sizes = [size for size in SIZES if size < largest] + [largest]
+    results = benchmark(sizes)
+    if len(sys.argv) == 3:
+        with open(sys.argv[2], "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
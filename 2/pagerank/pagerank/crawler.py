@@ -0,0 +1,141 @@
+import json
+import os
+import re
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Suggested name of a link cache file
+CACHE = ".links.json"
+
+# Bytes read from a file at a time
+CHUNK = 1 << 20
+
+# Longest unfinished tag carried over from one chunk to the next
+MAX_TAG = 1 << 16
+
+# Below this many files to parse, a process pool costs more than it saves
+MIN_PARALLEL = 64
+
+
+def parse(path):
+    """
+    Returns the set of link targets in the HTML file at `path`.
+
+    The file is read in chunks, so memory use does not depend on its
+    size. A tag cut off at the end of a chunk is carried over and
+    searched again together with the next chunk.
+    """
+    links = set()
+    carry = ""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while True:
+            chunk = f.read(CHUNK)
+            if not chunk:
+                break
+            buffer = carry + chunk
+            links.update(LINK.findall(buffer))
+
+            start = buffer.rfind("<")
+            if start != -1 and buffer.find(">", start) == -1:
+                carry = buffer[start:][-MAX_TAG:]
+            else:
+                carry = ""
+    return links
+
+
+def _parse_entry(path):
+    return sorted(parse(path))
+
+
+def load_cache(path):
+    """Returns the cached links by filename, or nothing if unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return dict()
+
+
+def save_cache(path, cache):
+    """
+    Writes the cache atomically, so a crash cannot leave it corrupt.
+    Returns whether it was written: an unwritable cache is skipped.
+    """
+    temporary = path + ".tmp"
+    try:
+        with open(temporary, "w") as f:
+            json.dump(cache, f, separators=(",", ":"))
+        os.replace(temporary, path)
+    except OSError:
+        return False
+    return True
+
+
+def crawl(directory, processes=None, cache=None):
+    """
+    Parse a directory of HTML pages and check for links to other pages.
+    Return a dictionary where each key is a page, and values are
+    a set of all other pages in the corpus that are linked to by the page.
+
+    If `cache` names a file, links found in each file are cached there,
+    keyed by file name together with size and modification time, so only
+    new or changed files are parsed again. Those are parsed in a pool of
+    `processes` worker processes when there are enough of them.
+    """
+    cached = load_cache(cache) if cache else dict()
+
+    # Find the files whose cache entry is missing or out of date
+    entries = dict()
+    stale = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if not entry.name.endswith(".html") or not entry.is_file():
+                continue
+            stat = entry.stat()
+            key = [stat.st_size, stat.st_mtime_ns]
+            old = cached.get(entry.name)
+            if old is not None and old[:2] == key:
+                entries[entry.name] = old
+            else:
+                entries[entry.name] = key + [None]
+                stale.append(entry.name)
+
+    # Parse them, in parallel if worthwhile
+    paths = [os.path.join(directory, name) for name in stale]
+    workers = processes or os.cpu_count() or 1
+    if len(paths) >= MIN_PARALLEL and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(len(paths) // (4 * workers), 1)
+            results = executor.map(_parse_entry, paths, chunksize=chunksize)
+            for name, links in zip(stale, results):
+                entries[name][2] = links
+    else:
+        for name, path in zip(stale, paths):
+            entries[name][2] = _parse_entry(path)
+
+    # Files that disappeared are dropped from the cache along the way
+    if cache and (stale or len(entries) != len(cached)):
+        save_cache(cache, entries)
+
+    # Only include links to other pages in the corpus
+    pages = dict()
+    for filename, (_, _, links) in entries.items():
+        pages[filename] = entries.keys() & links
+        pages[filename].discard(filename)
+    return pages
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python crawler.py corpus [cache.json]")
+    corpus = crawl(sys.argv[1], cache=sys.argv[2] if len(sys.argv) == 3
+                   else None)
+    links = sum(len(links) for links in corpus.values())
+    print(f"{len(corpus)} pages, {links} links")
+
+
+if __name__ == "__main__":
+    main()
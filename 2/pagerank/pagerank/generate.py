@@ -0,0 +1,87 @@
+import os
+import random
+import sys
+
+LINKS = 3
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+    <head>
+        <title>{name}</title>
+    </head>
+    <body>
+        <h1>{name}</h1>
+
+        <div>Links:</div>
+        <ul>
+{links}
+        </ul>
+    </body>
+</html>
+"""
+
+LINK = '            <li><a href="{target}">{title}</a></li>'
+
+
+def page_name(i):
+    """Returns the file name of page number `i`."""
+    return f"{i}.html"
+
+
+def preferential_attachment(n, links=LINKS, seed=None):
+    """
+    Returns a corpus of `n` pages whose links follow preferential
+    attachment, so in-degrees follow a power law like on the web.
+
+    Pages are added one at a time. Each links to a random number of
+    pages (`links` on average, sometimes none), picked among the pages
+    so far with probability proportional to their in-degree plus one.
+    The links of the first pages are filled in once all pages exist,
+    so early pages link to late ones too.
+    """
+    rng = random.Random(seed)
+    corpus = dict()
+
+    # Each page appears once, plus once per link to it
+    targets = []
+    for i in range(n):
+        name = page_name(i)
+        corpus[name] = set()
+        count = rng.randint(0, 2 * links)
+        if targets:
+            corpus[name] = {rng.choice(targets) for _ in range(count)}
+        targets.extend(corpus[name])
+        targets.append(name)
+
+    # The first page had nobody to link to
+    if n > 1:
+        first = page_name(0)
+        count = rng.randint(0, 2 * links)
+        corpus[first] = {rng.choice(targets) for _ in range(count)} - {first}
+    return corpus
+
+
+def write_corpus(corpus, directory):
+    """Writes a corpus as HTML pages, one file per page, to `directory`."""
+    os.makedirs(directory, exist_ok=True)
+    for name, links in corpus.items():
+        items = "\n".join(LINK.format(target=target, title=target[:-5])
+                          for target in sorted(links))
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(PAGE.format(name=name[:-5], links=items))
+
+
+def main():
+    if len(sys.argv) not in (3, 4, 5):
+        sys.exit("Usage: python generate.py pages directory [links] [seed]")
+    n = int(sys.argv[1])
+    links = int(sys.argv[3]) if len(sys.argv) >= 4 else LINKS
+    seed = int(sys.argv[4]) if len(sys.argv) == 5 else None
+    corpus = preferential_attachment(n, links, seed)
+    write_corpus(corpus, sys.argv[2])
+    total = sum(len(links) for links in corpus.values())
+    print(f"{n} pages, {total} links")
+
+
+if __name__ == "__main__":
+    main()
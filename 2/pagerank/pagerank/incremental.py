@@ -0,0 +1,221 @@
+import collections
+
+from sparse import DAMPING, Graph, power_iteration
+
+# Residual below which a page is not pushed any further
+EPSILON = 1e-10
+
+
+class IncrementalPageRank():
+    """
+    PageRank of a corpus that changes over time.
+
+    PageRank is the solution x of x = (1 - d) / N + d * (A x + D / N),
+    where (A x)[v] sums x[u] / |links(u)| over pages u linking to v and
+    D is the rank of the pages without links. After a change to the
+    corpus only a few terms of this equation differ, so the residual of
+    the previous ranks is zero except next to the changed pages, plus a
+    part that is the same for every page (from the change in N and D).
+
+    The local part is settled by pushing residuals along links, which
+    only visits pages near the change. The uniform part is settled
+    exactly by rescaling all ranks, which is stored as a single factor:
+    the rank of page p is `scale * values[p]`.
+    """
+
+    def __init__(self, corpus, damping_factor=DAMPING, epsilon=EPSILON,
+                 ranks=None):
+        self.damping = damping_factor
+        self.epsilon = epsilon
+        self.corpus = {page: set(links) for page, links in corpus.items()}
+        self.inlinks = {page: set() for page in self.corpus}
+        for page, links in self.corpus.items():
+            for link in links:
+                self.inlinks[link].add(page)
+
+        if ranks is None:
+            graph = Graph.from_corpus(self.corpus)
+            ranks = graph.to_dict(
+                power_iteration(graph, damping_factor, tolerance=1e-12))
+        self.values = dict(ranks)
+        self.scale = 1.0
+
+        # Unsettled residual: per page, in units of `values`, plus an
+        # amount common to all pages
+        self.residual = dict()
+        self.uniform = 0.0
+
+        # Total of `values` over pages without links
+        self.dangling = sum(self.values[page]
+                            for page, links in self.corpus.items()
+                            if not links)
+
+    def rank(self, page):
+        """Returns the current PageRank of `page`."""
+        return self.scale * self.values[page]
+
+    def ranks(self):
+        """Returns the current PageRank of every page as a dictionary."""
+        return {page: self.scale * value
+                for page, value in self.values.items()}
+
+    def update(self, added_pages=(), removed_pages=(),
+               added_links=(), removed_links=(), method="push"):
+        """
+        Applies a change to the corpus and updates the ranks.
+
+        Links are (source, target) pairs. Removing a page also removes
+        every link to and from it. With method "push", residuals are
+        propagated from the changed pages only; with "warm", the power
+        iteration is rerun over the whole corpus starting from the
+        previous ranks.
+        """
+        d = self.damping
+        added_pages = [page for page in dict.fromkeys(added_pages)
+                       if page not in self.corpus]
+        removed_pages = set(removed_pages) & self.corpus.keys()
+        n_old = len(self.corpus)
+        n_new = n_old + len(added_pages) - len(removed_pages)
+        if n_new == 0:
+            raise ValueError("cannot remove every page")
+        exists = (lambda page: page not in removed_pages
+                  and (page in self.corpus or page in added_pages))
+
+        # New links of every page whose links change
+        changed = dict()
+
+        def links(page):
+            if page not in changed:
+                changed[page] = set(self.corpus.get(page, ()))
+            return changed[page]
+
+        for page in removed_pages:
+            for source in self.inlinks[page]:
+                links(source).discard(page)
+            links(page).clear()
+        for page in added_pages:
+            links(page)
+        for source, target in removed_links:
+            if exists(source):
+                links(source).discard(target)
+        for source, target in added_links:
+            if not exists(source) or not exists(target):
+                raise ValueError(f"no such page in link {source} -> {target}")
+            if source != target:
+                links(source).add(target)
+
+        # Local residual: how (A x)[v] changes for targets of changed pages
+        dangling_old = self.scale * self.dangling
+        for page, new in changed.items():
+            old = self.corpus.get(page, set())
+            x = self.values.get(page, 0.0)
+            if old:
+                for target in old:
+                    self.add_residual(target, -d * x / len(old))
+            elif page in self.values:
+                self.dangling -= self.values[page]
+            if page in removed_pages:
+                continue
+            if new:
+                for target in new:
+                    self.add_residual(target, d * x / len(new))
+            else:
+                self.dangling += self.values.get(page, 0.0)
+
+        # Apply the change to the corpus
+        for page in added_pages:
+            self.corpus[page] = set()
+            self.inlinks[page] = set()
+            self.values[page] = 0.0
+        for page, new in changed.items():
+            for target in self.corpus[page] - new:
+                if target in self.inlinks:
+                    self.inlinks[target].discard(page)
+            for target in new - self.corpus[page]:
+                self.inlinks[target].add(page)
+            self.corpus[page] = new
+        for page in removed_pages:
+            del self.corpus[page]
+            del self.inlinks[page]
+            del self.values[page]
+            self.residual.pop(page, None)
+
+        # New pages start at zero, so their residual is the constant term
+        for page in added_pages:
+            self.add_residual(
+                page, ((1 - d) + d * dangling_old) / n_old / self.scale)
+
+        # Part of the residual common to all pages
+        dangling_new = self.scale * self.dangling
+        self.uniform += ((1 - d) * (1 / n_new - 1 / n_old)
+                         + d * (dangling_new / n_new - dangling_old / n_old))
+
+        if method == "push":
+            self.settle()
+        elif method == "warm":
+            self.restart()
+        else:
+            raise ValueError(f"unknown method {method}")
+
+    def add_residual(self, page, amount):
+        """Adds `amount` to the residual of `page`, in units of `values`."""
+        self.residual[page] = self.residual.get(page, 0.0) + amount
+
+    def settle(self):
+        """
+        Pushes residuals until every page's residual is below epsilon.
+
+        Pushing a residual r from page u adds r to u's rank and passes
+        d * r on along u's links, or evenly to every page (the uniform
+        residual) if u has no links.
+        """
+        d = self.damping
+        n = len(self.corpus)
+        residual = self.residual
+        while True:
+            threshold = self.epsilon / self.scale
+            queue = collections.deque(
+                page for page, r in residual.items()
+                if abs(r) > threshold
+            )
+            if not queue and not self.uniform:
+                break
+            queued = set(queue)
+            while queue:
+                page = queue.popleft()
+                queued.discard(page)
+                r = residual.pop(page, 0.0)
+                self.values[page] += r
+                links = self.corpus[page]
+                if not links:
+                    self.dangling += r
+                    self.uniform += d * self.scale * r / n
+                    continue
+                share = d * r / len(links)
+                for link in links:
+                    residual[link] = value = residual.get(link, 0.0) + share
+                    if abs(value) > threshold and link not in queued:
+                        queue.append(link)
+                        queued.add(link)
+
+            # Scaling x by (1 + k) scales the residual by (1 + k) and
+            # subtracts k times the constant term, which cancels the
+            # uniform residual for the right k. Local residuals are kept
+            # in units of `values`, so they scale along for free.
+            k = self.uniform / ((1 - d) / n - self.uniform)
+            self.scale *= 1 + k
+            self.uniform = 0.0
+
+    def restart(self):
+        """Reruns the power iteration, starting from the current ranks."""
+        graph = Graph.from_corpus(self.corpus)
+        start = [self.rank(page) for page in graph.pages]
+        ranks = power_iteration(graph, self.damping, tolerance=1e-12,
+                                start=start)
+        self.values = graph.to_dict(ranks)
+        self.scale = 1.0
+        self.residual = dict()
+        self.uniform = 0.0
+        self.dangling = sum(self.values[page]
+                            for page, links in self.corpus.items()
+                            if not links)
@@ -0,0 +1,229 @@
+import json
+import os
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import crawler
+from sparse import DAMPING, TOLERANCE, solve
+
+# Files making up a graph on disk
+EDGES = "edges.bin"
+DEGREES = "degrees.npy"
+PAGES = "pages.txt"
+META = "graph.json"
+
+# Edges read from disk at a time
+BLOCK = 1 << 22
+
+# Bytes of edges sorted in memory at a time
+MEMORY = 1 << 28
+
+# Pages listed by the command line tool
+TOP = 10
+
+
+class EdgeList():
+    """
+    Link graph stored on disk as a binary list of (source, target) page
+    index pairs, sorted by source, and memory-mapped.
+
+    Multiplying by the transition matrix streams the edges from disk a
+    block at a time, so only vectors with one entry per page are held in
+    memory, however many links there are. The graph has the `n` and
+    `step` of sparse.Graph, so sparse.solve iterates it with the solvers
+    that only take whole steps (jacobi, aitken and quadratic).
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, META)) as f:
+            meta = json.load(f)
+        self.path = path
+        self.n = meta["pages"]
+        self.m = meta["edges"]
+        dtype = np.dtype(meta["dtype"])
+        if self.m:
+            self.edges = np.memmap(os.path.join(path, EDGES), dtype=dtype,
+                                   mode="r", shape=(self.m, 2))
+        else:
+            self.edges = np.zeros((0, 2), dtype=dtype)
+        self.out_degree = np.load(os.path.join(path, DEGREES))
+        self.dangling = self.out_degree == 0
+        self.inverse_degree = np.where(
+            self.dangling, 0.0, 1.0 / np.maximum(self.out_degree, 1))
+        self._pages = None
+
+    @property
+    def pages(self):
+        """Page names, read from disk on first use."""
+        if self._pages is None:
+            with open(os.path.join(self.path, PAGES),
+                      encoding="utf-8") as f:
+                self._pages = f.read().splitlines()
+        return self._pages
+
+    def multiply(self, x):
+        """
+        Returns the vector whose entry `i` is the sum, over pages `j`
+        linking to page `i`, of x[j] divided by the out-degree of `j`.
+        """
+        weights = x * self.inverse_degree
+        result = np.zeros(self.n)
+        for start in range(0, self.m, BLOCK):
+            block = np.asarray(self.edges[start:start + BLOCK])
+            result += np.bincount(block[:, 1], weights=weights[block[:, 0]],
+                                  minlength=self.n)
+        return result
+
+    def step(self, ranks, damping_factor):
+        """Applies one step of the PageRank recurrence to `ranks`."""
+        dangling = ranks[self.dangling].sum()
+        return ((1 - damping_factor) / self.n
+                + damping_factor * (self.multiply(ranks)
+                                    + dangling / self.n))
+
+    def to_dict(self, ranks):
+        """Returns a rank vector as a dictionary from page name to rank."""
+        return dict(zip(self.pages, ranks.tolist()))
+
+
+def index_dtype(n):
+    """Returns the smallest integer type used to store page indices."""
+    return np.int32 if n < 2 ** 31 else np.int64
+
+
+def write_meta(path, pages, edges, degrees):
+    """Writes everything about a graph on disk but its edges."""
+    np.save(os.path.join(path, DEGREES), degrees)
+    with open(os.path.join(path, PAGES), "w", encoding="utf-8") as f:
+        for page in pages:
+            f.write(page + "\n")
+    with open(os.path.join(path, META), "w") as f:
+        json.dump({"pages": len(degrees), "edges": edges,
+                   "dtype": np.dtype(index_dtype(len(degrees))).name}, f)
+
+
+def export_corpus(directory, path, processes=None):
+    """
+    Writes the link graph of a directory of HTML pages to `path`.
+
+    Pages are numbered in sorted order and parsed in that order, so the
+    edges come out sorted by source and are appended straight to disk;
+    only the page names are kept in memory.
+    """
+    os.makedirs(path, exist_ok=True)
+    names = sorted(entry.name for entry in os.scandir(directory)
+                   if entry.name.endswith(".html") and entry.is_file())
+    index = {name: i for i, name in enumerate(names)}
+    dtype = index_dtype(len(names))
+    degrees = np.zeros(len(names), dtype=np.int64)
+    paths = [os.path.join(directory, name) for name in names]
+
+    workers = processes or os.cpu_count() or 1
+    with open(os.path.join(path, EDGES), "wb") as f:
+        if len(paths) >= crawler.MIN_PARALLEL and workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            chunksize = max(len(paths) // (4 * workers), 1)
+            results = executor.map(crawler._parse_entry, paths,
+                                   chunksize=chunksize)
+        else:
+            executor = None
+            results = map(crawler._parse_entry, paths)
+        try:
+            for i, links in enumerate(results):
+                targets = sorted(index[link] for link in links
+                                 if link in index and index[link] != i)
+                degrees[i] = len(targets)
+                pairs = np.empty((len(targets), 2), dtype=dtype)
+                pairs[:, 0] = i
+                pairs[:, 1] = targets
+                pairs.tofile(f)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    write_meta(path, names, int(degrees.sum()), degrees)
+
+
+def write_edges(path, pages, chunks, memory=MEMORY):
+    """
+    Writes a graph with the given page names to `path` from `chunks`, an
+    iterable of (sources, targets) index arrays in any order.
+
+    The edges are sorted on disk by source range: a first pass writes
+    them out as they come while counting out-degrees, which splits the
+    sources into ranges of about `memory` bytes of edges each; a second
+    pass distributes the edges into one file per range; each range is
+    then sorted in memory and appended to the edge list.
+    """
+    os.makedirs(path, exist_ok=True)
+    n = len(pages)
+    dtype = index_dtype(n)
+    record = 2 * np.dtype(dtype).itemsize
+    unsorted = os.path.join(path, EDGES + ".unsorted")
+    degrees = np.zeros(n, dtype=np.int64)
+    with open(unsorted, "wb") as f:
+        for sources, targets in chunks:
+            pairs = np.column_stack((sources, targets)).astype(dtype)
+            if len(pairs) and (pairs.min() < 0 or pairs.max() >= n):
+                raise ValueError("page index out of range")
+            pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+            degrees += np.bincount(pairs[:, 0], minlength=n)
+            pairs.tofile(f)
+    m = int(degrees.sum())
+
+    # Split sources into ranges holding about `memory` bytes of edges
+    ends = np.cumsum(degrees) * record
+    bounds = np.searchsorted(ends, np.arange(memory, ends[-1] if n else 0,
+                                             memory), side="right")
+    bounds = np.unique(np.concatenate(([0], bounds, [n])))
+
+    # Distribute the edges into one file per range
+    parts = [os.path.join(path, f"{EDGES}.{i}")
+             for i in range(len(bounds) - 1)]
+    files = [open(part, "wb") for part in parts]
+    try:
+        edges = (np.memmap(unsorted, dtype=dtype, mode="r", shape=(m, 2))
+                 if m else np.zeros((0, 2), dtype=dtype))
+        for start in range(0, m, BLOCK):
+            block = np.asarray(edges[start:start + BLOCK])
+            part = np.searchsorted(bounds, block[:, 0], side="right") - 1
+            order = np.argsort(part, kind="stable")
+            block, part = block[order], part[order]
+            cuts = np.searchsorted(part, np.arange(len(files) + 1))
+            for i, f in enumerate(files):
+                block[cuts[i]:cuts[i + 1]].tofile(f)
+        del edges
+    finally:
+        for f in files:
+            f.close()
+    os.remove(unsorted)
+
+    # Sort each range in memory, dropping repeated links
+    degrees = np.zeros(n, dtype=np.int64)
+    with open(os.path.join(path, EDGES), "wb") as f:
+        for part in parts:
+            block = np.unique(np.fromfile(part, dtype=dtype).reshape(-1, 2),
+                              axis=0)
+            degrees += np.bincount(block[:, 0], minlength=n)
+            block.tofile(f)
+            os.remove(part)
+    write_meta(path, pages, int(degrees.sum()), degrees)
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python outofcore.py corpus graph")
+    export_corpus(sys.argv[1], sys.argv[2])
+    graph = EdgeList(sys.argv[2])
+    ranks, report = solve(graph, DAMPING, TOLERANCE)
+    print(f"PageRank Results from Iteration ({graph.n} pages, "
+          f"{graph.m} links)")
+    for i in np.argsort(-ranks, kind="stable")[:TOP]:
+        print(f"  {graph.pages[i]}: {ranks[i]:.4f}")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,31 @@
-import os
 import random
-import re
 import sys
 
+import crawler
+from sparse import (Graph, SOLVERS, TOLERANCE, sample_parallel,
+                    sample_walkers, solve)
+
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Walkers per process when sampling in several processes
+WALKERS = 10000
+
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
+    method = sys.argv[2] if len(sys.argv) == 3 else "jacobi"
+    if len(sys.argv) not in (2, 3) or method not in SOLVERS:
+        sys.exit(f"Usage: python pagerank.py corpus [{'|'.join(SOLVERS)}]")
     corpus = crawl(sys.argv[1])
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    ranks, report = converge_pagerank(corpus, DAMPING, method=method)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
+    print(report)
 
 
 def crawl(directory):
@@ -26,26 +33,10 @@ def crawl(directory):
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
-    """
-    pages = dict()
-
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
-
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
 
-    return pages
+    Links are parsed in parallel, see crawler.crawl.
+    """
+    return crawler.crawl(directory)
 
 
 def transition_model(corpus, page, damping_factor):
@@ -75,7 +66,8 @@ def transition_model(corpus, page, damping_factor):
     return transition
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, walkers=None, workers=None,
+                    seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -83,24 +75,47 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    Rather than building the full transition model on every step, the
+    damping coin is flipped first and then a link or a page is picked
+    uniformly, which follows the same distribution at O(1) per sample.
+    If `walkers` is given, that many surfers are advanced at once
+    with NumPy instead, and if `workers` is given, the samples are split
+    over that many processes with independent random streams.
+
+    Passing a `seed` makes the result reproducible, bit for bit, for the
+    same seed, `walkers` and `workers`.
     """
-    random.seed()
-    
-    pages = list(corpus.keys())
+    if workers:
+        graph = Graph.from_corpus(corpus)
+        return graph.to_dict(sample_parallel(
+            graph, damping_factor, n, workers, walkers or WALKERS, seed))
+    if walkers:
+        graph = Graph.from_corpus(corpus)
+        return graph.to_dict(
+            sample_walkers(graph, damping_factor, n, walkers, seed))
+
+    rng = random.Random(seed)
+
+    # Sorted, as set order changes with the string hash seed
+    pages = sorted(corpus)
+    links = {p: tuple(sorted(corpus[p])) for p in pages}
     count = dict()
 
     #build count dictionary : each initial count is zero
     for p in pages:
         count[p] = 0
     # choose initial state randomly
-    state = random.choice(pages)
+    state = rng.choice(pages)
     count[state] += 1
 
     for i in range(0, n-1):
-        transition = transition_model(corpus, state, damping_factor)
-        varList = list(transition.keys())
-        varDist = list(transition.values())
-        state = random.choices(varList, varDist)[0]
+        out = links[state]
+        # follow a link with probability damping_factor, if there are any
+        if out and rng.random() < damping_factor:
+            state = rng.choice(out)
+        else:
+            state = rng.choice(pages)
         count[state] += 1
     
     for s in count:
@@ -108,7 +123,8 @@ def sample_pagerank(corpus, damping_factor, n):
 
     return count
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                     method="jacobi"):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -116,34 +132,25 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    The corpus is turned into a sparse transition matrix once, and the
+    iteration stops when the ranks move by less than `tolerance` in
+    total (L1 distance) from one sweep to the next. `method` is one of
+    the solvers in sparse.SOLVERS.
     """
+    return converge_pagerank(corpus, damping_factor, tolerance, method)[0]
 
-    pages = list(corpus.keys())
-    count = dict()
 
-    N = len(pages)
-    #build count dictionary : each initial count is zero
-    for p in pages:
-        count[p] = 1/N
+def converge_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                      method="jacobi"):
+    """
+    Like `iterate_pagerank`, but also returns a sparse.Report with the
+    L1 residual of every iteration, the iteration count and wall time.
+    """
+    graph = Graph.from_corpus(corpus)
+    ranks, report = solve(graph, damping_factor, tolerance, method=method)
+    return graph.to_dict(ranks), report
 
-    flag = True
-    while flag:
-        flag = False
-        for p in pages:
-            tmp = (1-damping_factor)/N
-            for i in pages:
-                links = corpus[i]
-                # no links: assume link to everyone including itself
-                if links==set():
-                    tmp += damping_factor*(count[i]/N)
-                else: 
-                    if p in links:
-                        tmp += damping_factor*(count[i]/len(links))
-            # if significant change : update and continue updating the system
-            if abs(tmp-count[p])>0.001:
-                count[p] = tmp
-                flag = True
-    return count
 
 if __name__ == "__main__":
     main()
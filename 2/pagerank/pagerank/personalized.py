@@ -0,0 +1,178 @@
+import collections
+import sys
+
+import numpy as np
+
+import crawler
+from sparse import DAMPING, Graph
+
+# Random walks stored per page
+WALKS = 64
+
+# Residual below which a page is not pushed any further
+EPSILON = 1e-9
+
+# Pages listed by the command line tool
+TOP = 10
+
+
+class Fingerprints():
+    """
+    Monte Carlo fingerprints for personalized PageRank.
+
+    Personalized PageRank replaces the jump to a uniformly chosen page by
+    a jump to a page drawn from a teleport distribution over seed pages.
+    Its value is proportional to the chance that a surfer starting from
+    the teleport distribution, and stopping at each step with probability
+    1 - d, stops at each page, counting only surfers that never reach a
+    page without links (from there they would jump back to the teleport
+    distribution and start over). This is linear in the teleport
+    distribution, so it is enough to record, for every page, where a
+    fixed number of such walks starting there end: `endpoints[i]` holds
+    the final pages of the walks from page `i`, or -1 for walks lost at a
+    page without links. With a uniform teleport distribution this is
+    ordinary PageRank.
+    """
+
+    def __init__(self, graph, endpoints, damping_factor):
+        self.graph = graph
+        self.endpoints = endpoints
+        self.damping = damping_factor
+        self.index = {page: i for i, page in enumerate(graph.pages)}
+
+    @classmethod
+    def build(cls, graph, damping_factor=DAMPING, walks=WALKS, seed=None):
+        """Simulates `walks` walks from every page of `graph`."""
+        rng = np.random.default_rng(seed)
+        dtype = np.int32 if graph.n < 2 ** 31 else np.int64
+        endpoints = np.full((graph.n, walks), -1, dtype=dtype)
+        flat = endpoints.reshape(-1)
+
+        # All walks advance together; `walk` is their index in `flat`.
+        # A walk continues with probability d, if its page has links.
+        go = np.where(graph.dangling, 0.0, damping_factor)
+        walk = np.arange(graph.n * walks)
+        state = walk // walks
+        while len(walk):
+            coin = rng.random(len(walk))
+            going = coin < go[state]
+            stop = coin >= damping_factor
+            flat[walk[stop]] = state[stop]
+            walk = walk[going]
+            state = state[going]
+
+            # Reuse the coin, uniform on [0, d) once known to be below d
+            link = (coin[going] * (graph.out_degree[state] / damping_factor)
+                    ).astype(np.int64)
+            state = graph.out_indices[graph.out_indptr[state] + link]
+        return cls(graph, endpoints, damping_factor)
+
+    def save(self, path):
+        """Writes the fingerprints to a compressed .npz file."""
+        np.savez_compressed(path, pages=np.array(self.graph.pages),
+                            endpoints=self.endpoints,
+                            damping=self.damping)
+
+    @classmethod
+    def load(cls, path, graph):
+        """Reads fingerprints saved by `save` for the same `graph`."""
+        with np.load(path) as data:
+            if data["pages"].tolist() != graph.pages:
+                raise ValueError("fingerprints are for a different corpus")
+            return cls(graph, data["endpoints"], float(data["damping"]))
+
+    def personalized(self, teleport):
+        """
+        Returns the estimated personalized PageRank for `teleport`, a
+        dictionary from seed page to weight or a collection of seed pages
+        (weighted equally), as a dictionary of the pages with a nonzero
+        estimate. Only the fingerprints of the seed pages are read.
+        """
+        seeds, weights = distribution(self.index, teleport)
+        ends = self.endpoints[seeds]
+        weights = np.repeat(weights, ends.shape[1])
+        ends = ends.reshape(-1)
+        found = ends >= 0
+        pages, inverse = np.unique(ends[found], return_inverse=True)
+        scores = np.bincount(inverse, weights=weights[found],
+                             minlength=len(pages))
+        total = scores.sum()
+        if total == 0:
+            return dict()
+        return {self.graph.pages[i]: score
+                for i, score in zip(pages.tolist(), (scores / total).tolist())}
+
+    def top(self, teleport, k=TOP):
+        """Returns the `k` pages ranked highest for `teleport`."""
+        scores = self.personalized(teleport)
+        return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+
+def distribution(index, teleport):
+    """
+    Returns the page indices and normalized weights of a teleport
+    distribution given as a dictionary or as a collection of pages,
+    looking pages up in `index`.
+    """
+    if not isinstance(teleport, dict):
+        teleport = dict.fromkeys(teleport, 1.0)
+    try:
+        seeds = np.array([index[page] for page in teleport], dtype=np.int64)
+    except KeyError as e:
+        raise ValueError(f"no such page {e.args[0]}") from None
+    weights = np.array(list(teleport.values()), dtype=float)
+    if not len(seeds) or weights.sum() <= 0 or (weights < 0).any():
+        raise ValueError("teleport weights must be nonnegative, not all 0")
+    return seeds, weights / weights.sum()
+
+
+def push_pagerank(graph, teleport, damping_factor=DAMPING, epsilon=EPSILON):
+    """
+    Returns personalized PageRank for `teleport` by forward push, to
+    within `epsilon` per page, for validating the fingerprints.
+
+    Every page holds an estimate and a residual, starting with the
+    teleport distribution as residual. Pushing page u moves 1 - d of its
+    residual into its estimate and spreads the remaining d over its
+    links; residual reaching a page without links is dropped, which is
+    made up for by normalizing at the end (see `Fingerprints`).
+    """
+    index = {page: i for i, page in enumerate(graph.pages)}
+    seeds, weights = distribution(index, teleport)
+    residual = dict(zip(seeds.tolist(), weights.tolist()))
+    estimate = collections.defaultdict(float)
+    queue = collections.deque(residual)
+    queued = set(queue)
+    while queue:
+        page = queue.popleft()
+        queued.discard(page)
+        r = residual.pop(page)
+        estimate[page] += (1 - damping_factor) * r
+        start, end = graph.out_indptr[page], graph.out_indptr[page + 1]
+        if start == end:
+            continue
+        share = damping_factor * r / (end - start)
+        for link in graph.out_indices[start:end].tolist():
+            residual[link] = value = residual.get(link, 0.0) + share
+            if value > epsilon and link not in queued:
+                queue.append(link)
+                queued.add(link)
+
+    total = sum(estimate.values())
+    return {graph.pages[i]: value / total for i, value in estimate.items()}
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python personalized.py corpus seed [seed ...]")
+    graph = Graph.from_corpus(crawler.crawl(sys.argv[1]))
+    seeds = sys.argv[2:]
+    fingerprints = Fingerprints.build(graph)
+    exact = push_pagerank(graph, seeds)
+    print(f"Personalized PageRank for {', '.join(seeds)}")
+    for page, score in fingerprints.top(seeds):
+        print(f"  {page}: {score:.4f} (push: {exact.get(page, 0):.4f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+DAMPING = 0.85
+TOLERANCE = 1e-6
+MAX_ITERATIONS = 1000
+
+# Blocks of pages updated one after another by Gauss-Seidel
+BLOCKS = 64
+
+# Sweeps between two extrapolations
+EXTRAPOLATE = 10
+
+# Steps every surfer takes before its visits are counted
+BURN_IN = 50
+
+
+class Graph():
+    """
+    Link graph of a corpus in compressed sparse row (CSR) form.
+
+    Row `i` lists the pages linking to page `i`: their indices are
+    `indices[indptr[i]:indptr[i + 1]]`. Together with the out-degree of
+    every page this is the transition matrix of the random surfer, and
+    multiplying by it is a handful of vectorized NumPy operations.
+    Pages without links are flagged as dangling and handled separately.
+
+    The links are also kept grouped by source, in `out_indptr` and
+    `out_indices`, for following a random out-link in constant time.
+    """
+
+    def __init__(self, pages, sources, targets):
+        """
+        Builds the graph for the list of page names `pages` from parallel
+        arrays of source and target page indices, one entry per link.
+        """
+        self.pages = list(pages)
+        self.n = len(self.pages)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        # Sort links by target to group them into rows
+        order = np.argsort(targets, kind="stable")
+        self.indices = sources[order]
+        self.indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=self.n),
+                  out=self.indptr[1:])
+
+        self.out_degree = np.bincount(sources, minlength=self.n)
+        order = np.argsort(sources, kind="stable")
+        self.out_indices = targets[order]
+        self.out_indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(self.out_degree, out=self.out_indptr[1:])
+        self.dangling = self.out_degree == 0
+        self.inverse_degree = np.where(
+            self.dangling, 0.0, 1.0 / np.maximum(self.out_degree, 1))
+
+        # Rows with no incoming links, which np.add.reduceat cannot express
+        self.empty = self.indptr[:-1] == self.indptr[1:]
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """Builds the graph for a corpus as returned by `crawl`."""
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        sources = []
+        targets = []
+        for page in pages:
+            i = index[page]
+            for link in sorted(corpus[page]):
+                sources.append(i)
+                targets.append(index[link])
+        return cls(pages, sources, targets)
+
+    def multiply(self, x):
+        """
+        Returns the vector whose entry `i` is the sum, over pages `j`
+        linking to page `i`, of x[j] divided by the out-degree of `j`.
+        """
+        return self.rows(x * self.inverse_degree, 0, self.n)
+
+    def rows(self, weights, lo, hi):
+        """
+        Returns entries `lo` to `hi` of `multiply(x)`, given the weights
+        x * inverse_degree, touching only the links into those pages.
+        """
+        start, end = self.indptr[lo], self.indptr[hi]
+        if start == end:
+            return np.zeros(hi - lo)
+        # A trailing zero gives empty rows at the end a valid offset
+        values = np.append(weights[self.indices[start:end]], 0.0)
+        result = np.add.reduceat(values, self.indptr[lo:hi] - start)
+        result[self.empty[lo:hi]] = 0
+        return result
+
+    def step(self, ranks, damping_factor):
+        """
+        Applies one step of the PageRank recurrence to `ranks`.
+
+        A dangling page is treated as linking to every page, which adds
+        the same amount to every entry (a rank-one correction) instead
+        of storing N links for it.
+        """
+        dangling = ranks[self.dangling].sum()
+        return ((1 - damping_factor) / self.n
+                + damping_factor * (self.multiply(ranks)
+                                    + dangling / self.n))
+
+    def to_dict(self, ranks):
+        """Returns a rank vector as a dictionary from page name to rank."""
+        return dict(zip(self.pages, ranks.tolist()))
+
+
+class Report():
+    """
+    Convergence report of a PageRank solver: the L1 distance between
+    successive iterates after each iteration, and the wall time taken.
+    """
+
+    def __init__(self, method):
+        self.method = method
+        self.residuals = []
+        self.seconds = 0.0
+        self.converged = False
+
+    @property
+    def iterations(self):
+        return len(self.residuals)
+
+    def __str__(self):
+        status = "converged" if self.converged else "did not converge"
+        residual = self.residuals[-1] if self.residuals else 0.0
+        return (f"{self.method}: {status} after {self.iterations} "
+                f"iterations, residual {residual:.3g}, "
+                f"{self.seconds:.3f} seconds")
+
+
+def jacobi(graph, ranks, damping_factor):
+    """One sweep of the power iteration, updating all pages at once."""
+    return graph.step(ranks, damping_factor)
+
+
+def gauss_seidel(graph, ranks, damping_factor, blocks=BLOCKS):
+    """
+    One sweep of block Gauss-Seidel: pages are updated a block at a time,
+    and each block already uses the new ranks of the blocks before it.
+    Within a block the update is vectorized like a Jacobi step.
+
+    The teleport term is taken as (1 - d) times the current total rank
+    rather than (1 - d), making the sweep linear, so normalizing after
+    each sweep is a power iteration that converges to PageRank itself.
+    """
+    n = graph.n
+    ranks = ranks.copy()
+    weights = ranks * graph.inverse_degree
+    dangling = ranks[graph.dangling].sum()
+    total = ranks.sum()
+    bounds = np.linspace(0, n, min(blocks, n) + 1).astype(np.int64)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        old = ranks[lo:hi].copy()
+        ranks[lo:hi] = ((1 - damping_factor) * total / n
+                        + damping_factor * (graph.rows(weights, lo, hi)
+                                            + dangling / n))
+        weights[lo:hi] = ranks[lo:hi] * graph.inverse_degree[lo:hi]
+        change = ranks[lo:hi] - old
+        dangling += change[graph.dangling[lo:hi]].sum()
+        total += change.sum()
+    return ranks / ranks.sum()
+
+
+def aitken(history):
+    """
+    Aitken's delta-squared extrapolation of the last three iterates,
+    page by page. Pages whose second difference vanishes keep their
+    latest value.
+    """
+    x0, x1, x2 = history[-3:]
+    denominator = x2 - 2 * x1 + x0
+    safe = np.abs(denominator) > 1e-15
+    result = x2.copy()
+    result[safe] -= (x2 - x1)[safe] ** 2 / denominator[safe]
+    return result
+
+
+def quadratic(history):
+    """
+    Quadratic extrapolation of the last four iterates (Kamvar et al.):
+    assumes the error lies mostly along the first few eigenvectors of the
+    transition matrix and fits a polynomial that cancels them.
+    """
+    x0, x1, x2, x3 = history[-4:]
+    y = np.column_stack((x1 - x0, x2 - x0))
+    gamma = np.linalg.lstsq(y, -(x3 - x0), rcond=None)[0]
+    g1, g2, g3 = gamma[0], gamma[1], 1.0
+    return (g1 + g2 + g3) * x1 + (g2 + g3) * x2 + g3 * x3
+
+
+# Solvers by name: the sweep, and the extrapolation applied periodically
+SOLVERS = {
+    "jacobi": (jacobi, None),
+    "gauss-seidel": (gauss_seidel, None),
+    "aitken": (jacobi, aitken),
+    "quadratic": (jacobi, quadratic),
+}
+
+
+def solve(graph, damping_factor=DAMPING, tolerance=TOLERANCE,
+          max_iterations=MAX_ITERATIONS, start=None, method="jacobi"):
+    """
+    Returns the PageRank vector of `graph` together with a `Report`.
+
+    Sweeps of the chosen solver are applied from `start` (the uniform
+    distribution by default) until the L1 distance between two
+    successive iterates falls below `tolerance`. Gauss-Seidel needs a
+    graph with `rows`, and raises ValueError on others. The extrapolating
+    solvers replace the iterate by an extrapolation of the last few
+    every `EXTRAPOLATE` sweeps.
+    """
+    if method not in SOLVERS:
+        raise ValueError(f"unknown method {method}")
+    sweep, extrapolate = SOLVERS[method]
+    if sweep is gauss_seidel and not hasattr(graph, "rows"):
+        raise ValueError(f"{method} needs the links into a range of pages, "
+                         f"which {type(graph).__name__} does not provide")
+    report = Report(method)
+    began = time.perf_counter()
+    if graph.n == 0:
+        report.converged = True
+        return np.zeros(0), report
+
+    ranks = (np.full(graph.n, 1 / graph.n) if start is None
+             else np.asarray(start, dtype=float))
+    history = [ranks]
+    for i in range(1, max_iterations + 1):
+        new_ranks = sweep(graph, ranks, damping_factor)
+        history = history[-3:] + [new_ranks]
+        if extrapolate and i % EXTRAPOLATE == 0 and len(history) == 4:
+            new_ranks = np.maximum(extrapolate(history), 0)
+            new_ranks /= new_ranks.sum()
+            history = [new_ranks]
+        residual = np.abs(new_ranks - ranks).sum()
+        report.residuals.append(float(residual))
+        ranks = new_ranks
+        if residual < tolerance:
+            report.converged = True
+            break
+    report.seconds = time.perf_counter() - began
+    return ranks / ranks.sum(), report
+
+
+def power_iteration(graph, damping_factor=DAMPING, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, start=None):
+    """
+    Returns the PageRank vector of `graph`, iterating from `start` (the
+    uniform distribution by default) until the L1 distance between two
+    successive iterates falls below `tolerance`.
+    """
+    return solve(graph, damping_factor, tolerance, max_iterations, start)[0]
+
+
+def advance(graph, state, damping_factor, rng):
+    """
+    Moves every surfer in `state` one step: on heads of the damping coin
+    it follows a uniformly chosen link of its page (read directly from
+    the out-link CSR arrays), on tails, or on a dangling page, it jumps
+    to a uniformly chosen page. Each step costs O(1) per surfer.
+    """
+    follow = ((rng.random(len(state)) < damping_factor)
+              & ~graph.dangling[state])
+    following = state[follow]
+    state = rng.integers(graph.n, size=len(state))
+    state[follow] = graph.out_indices[
+        graph.out_indptr[following]
+        + rng.integers(graph.out_degree[following])
+    ]
+    return state
+
+
+def sample_walkers(graph, damping_factor, n, walkers=10000, seed=None):
+    """
+    Returns PageRank estimated from `n` samples of random surfers, with
+    `walkers` surfers advanced together as NumPy arrays.
+    """
+    if walkers < 1:
+        raise ValueError("walkers must be at least 1")
+    if n <= 0 or graph.n == 0:
+        return np.zeros(graph.n)
+    return count_walkers(graph, damping_factor, n, walkers, seed) / n
+
+
+def count_walkers(graph, damping_factor, n, walkers=10000, seed=None):
+    """
+    Returns how often each page is visited in `n` samples of random
+    surfers, with `walkers` surfers advanced together as NumPy arrays.
+    `seed` is anything np.random.default_rng accepts.
+
+    The surfers start on uniformly chosen pages and take `BURN_IN` steps
+    before their pages are counted, since with many surfers each one
+    only takes a few counted steps, and the first steps of a surfer are
+    still close to where it started.
+    """
+    if walkers < 1:
+        raise ValueError("walkers must be at least 1")
+    rng = np.random.default_rng(seed)
+    counts = np.zeros(graph.n, dtype=np.int64)
+    if n <= 0 or graph.n == 0:
+        return counts
+
+    # Visits are counted in chunks, as counting costs O(pages) per call
+    chunk = max(graph.n, 1 << 20)
+    visited = []
+    pending = 0
+
+    state = rng.integers(graph.n, size=min(walkers, n))
+    for _ in range(BURN_IN):
+        state = advance(graph, state, damping_factor, rng)
+    remaining = n
+    while True:
+        visited.append(state)
+        pending += len(state)
+        remaining -= len(state)
+        if pending >= chunk or remaining <= 0:
+            counts += np.bincount(np.concatenate(visited),
+                                  minlength=graph.n)
+            visited = []
+            pending = 0
+        if remaining <= 0:
+            break
+        state = advance(graph, state[:remaining], damping_factor, rng)
+    return counts
+
+
+def sample_parallel(graph, damping_factor, n, workers, walkers=10000,
+                    seed=None):
+    """
+    Returns PageRank estimated from `n` samples of random surfers split
+    over `workers` processes.
+
+    Each worker gets its own random stream, spawned from one
+    np.random.SeedSequence, and the integer visit counts are added up
+    in worker order, so the result only depends on `seed` and the
+    number of workers, not on how the processes are scheduled.
+    """
+    if walkers < 1:
+        raise ValueError("walkers must be at least 1")
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    if n <= 0 or graph.n == 0:
+        return np.zeros(graph.n)
+    streams = np.random.SeedSequence(seed).spawn(workers)
+    shares = [n // workers + (i < n % workers) for i in range(workers)]
+    if workers == 1:
+        counts = [count_walkers(graph, damping_factor, n, walkers,
+                                streams[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            counts = list(executor.map(
+                count_walkers, [graph] * workers,
+                [damping_factor] * workers, shares,
+                [walkers] * workers, streams))
+    return np.sum(counts, axis=0) / n